@@ -1,16 +1,79 @@
 from flask import Flask, render_template, request, jsonify, redirect, url_for, send_from_directory
 import csv
+import heapq
 import io
 import os
+import queue
 import re
 import shutil
+import signal
+import sys
 import time
+import uuid
 import requests
 from datetime import datetime, timedelta
-from data_manager import DataManager
+from collection_query import decode_cursor, encode_cursor, is_paged, query_collection
+from compression import compress_stream, etag_matches, init_compression
+from data_manager import CHANGE_COLLECTIONS, DataManager, kb_search_score
+from ical_export import iter_calendar
+from interval_index import BusyIndex, from_minute, to_minute
+from json_provider import FastJSONProvider
+from reminder_index import describe_recurrence, recurrence_kind
+from reminder_scheduler import ReminderScheduler
 
 app = Flask(__name__)
-data_manager = DataManager()
+# orjson (when installed) behind jsonify and request.get_json, stdlib otherwise
+app.json = FastJSONProvider(app)
+# gzip (or brotli, if installed) for JSON, HTML, CSV and calendar responses
+init_compression(app)
+# JSON files are the default store; AXOLOTL_STORAGE=sqlite switches to the SQLite
+# backend (run `python sqlite_store.py migrate` once to import existing data)
+if os.environ.get("AXOLOTL_STORAGE", "json").lower() == "sqlite":
+    from sqlite_store import SQLiteDataManager
+    data_manager = SQLiteDataManager()
+else:
+    # AXOLOTL_FLUSH_INTERVAL (seconds) coalesces bursts of writes into one flush
+    # AXOLOTL_PRETTY_JSON=1 indents the data files instead of writing them compact
+    data_manager = DataManager(flush_interval=float(os.environ.get("AXOLOTL_FLUSH_INTERVAL", 0)),
+                               pretty_json=os.environ.get("AXOLOTL_PRETTY_JSON") == "1")
+
+@app.before_request
+def refresh_data():
+    # Pick up writes made by other worker processes
+    data_manager.refresh()
+
+# Started by the first /api/reminders/stream subscriber
+reminder_scheduler = ReminderScheduler(data_manager)
+
+@app.after_request
+def wake_reminder_scheduler(response):
+    # Reschedules only if this request (or a refresh) changed the reminders
+    reminder_scheduler.notify()
+    return response
+
+# Version counters restart with the process, so ETags carry a per-process token
+ETAG_TOKEN = uuid.uuid4().hex[:8]
+
+def _version_etag(name, *versions):
+    parts = [name, ETAG_TOKEN]
+    for version in versions:
+        # SQLite reports (own changes, external commits)
+        parts.extend(map(str, version) if isinstance(version, tuple) else [str(version)])
+    return "-".join(parts)
+
+def _conditional_json(etag, payload):
+    """
+    jsonify(payload()) with a strong ETag. Versions are read before the data,
+    so a matching If-None-Match gets a 304 without building or serializing it.
+    """
+    if etag_matches(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(payload())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
 TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
 BACKGROUND_FILENAMES = ("background.jpg", "background.png")
 
@@ -42,6 +105,14 @@ def days_since_filter(value):
     except:
         return 9999
 
+@app.template_filter('recurrence_label')
+def recurrence_label_filter(recurrence):
+    return describe_recurrence(recurrence)
+
+@app.template_filter('recurrence_kind')
+def recurrence_kind_filter(recurrence):
+    return recurrence_kind(recurrence or "None")
+
 @app.template_filter('days_until')
 def days_until_filter(date_str):
     if not date_str: return 999
@@ -71,8 +142,20 @@ def _reminder_alert_color(reminder, colors):
         return colors.get("nearing_2_weeks", "#F4C430")
     return ""
 
+# (reminder version, settings version, date) -> context for the reminder bell
+_reminder_flash_cache = (None, None)
+
 @app.context_processor
 def inject_reminder_flash():
+    global _reminder_flash_cache
+    key = (data_manager.data_version("reminders"), data_manager.data_version("settings"), datetime.now().date())
+    cached_key, flash = _reminder_flash_cache
+    if cached_key != key:
+        flash = _build_reminder_flash()
+        _reminder_flash_cache = (key, flash)
+    return flash
+
+def _build_reminder_flash():
     settings = data_manager.get_settings()
     colors = settings.get("colors", {})
     reminders = data_manager.get_upcoming_reminders(weeks=12)
@@ -482,21 +565,10 @@ def dashboard():
     timeframe = int(settings.get('timeframe', 6))
     upcoming_reminders = data_manager.get_upcoming_reminders(weeks=timeframe)
     future_reminders = data_manager.get_upcoming_reminders(weeks=12)
-    all_tasks = data_manager.get_all_tasks()
     active_tasks = data_manager.get_active_tasks()
-    all_projects = data_manager.get_all_projects()
-    projects = [p for p in all_projects if p.get('status') != 'Completed']
-    all_reminders = data_manager.get_all_reminders()
+    projects = data_manager.get_active_projects()
     user_name = data_manager.get_user_name()
-    settings = data_manager.get_settings()
-    counts = {
-        'tasks_active': len(active_tasks),
-        'tasks_done': len([t for t in all_tasks if t.get('status') == 'Completed']),
-        'projects_active': len(projects),
-        'projects_done': len([p for p in all_projects if p.get('status') == 'Completed']),
-        'reminders_upcoming': len(upcoming_reminders),
-        'reminders_total': len(all_reminders),
-    }
+    counts = data_manager.get_dashboard_summary(timeframe)
     return render_template('dashboard.html',
                            upcoming_reminders=upcoming_reminders,
                            future_reminders=future_reminders,
@@ -507,21 +579,169 @@ def dashboard():
                            counts=counts,
                            now=datetime.now())
 
+@app.route('/api/dashboard/summary')
+def dashboard_summary():
+    settings = data_manager.get_settings()
+    timeframe = int(settings.get('timeframe', 6))
+    return jsonify({
+        "counts": data_manager.get_dashboard_summary(timeframe),
+        "active_tasks": data_manager.get_active_tasks(),
+        "active_projects": data_manager.get_active_projects(),
+    })
+
 @app.route('/all')
 def all_items():
     reminders = data_manager.get_all_reminders()
     tasks = data_manager.get_all_tasks()
     kb_items = data_manager.get_kb_items()
-    projects = data_manager.get_all_projects()
+    projects = data_manager.get_project_summaries()
     return render_template('list_view.html', reminders=reminders, tasks=tasks, kb_items=kb_items, projects=projects)
 
 @app.route('/calendar')
 def calendar_view():
-    today = datetime.now().date()
-    start_date = today.replace(month=1, day=1) - timedelta(days=365)
-    end_date = today.replace(month=12, day=31) + timedelta(days=365)
-    projected = data_manager.get_projected_reminders(start_date, end_date)
-    return render_template('calendar.html', reminders=projected)
+    # Occurrences are fetched per visible window from /api/calendar/occurrences
+    return render_template('calendar.html')
+
+# A year view plus the leading/trailing days FullCalendar pads it with
+CALENDAR_MAX_DAYS = 400
+CALENDAR_PAGE_SIZE = 2000
+
+@app.route('/api/calendar/occurrences')
+def calendar_occurrences():
+    """
+    Reminder occurrences for one calendar window: start inclusive, end exclusive
+    (FullCalendar's convention). Occurrences refer to their reminder by id and
+    each reminder's details are sent once per page. Pages hold at most 'limit'
+    occurrences in (date, reminder id) order; pass back next_cursor for the
+    rest. The cursor is the last occurrence sent, so reminders added or removed
+    between pages never shift one.
+    """
+    try:
+        start = datetime.strptime(request.args.get('start', '')[:10], "%Y-%m-%d").date()
+        end = datetime.strptime(request.args.get('end', '')[:10], "%Y-%m-%d").date()
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD dates"}), 400
+    if not 0 < (end - start).days <= CALENDAR_MAX_DAYS:
+        return jsonify({"error": f"The window must span 1 to {CALENDAR_MAX_DAYS} days"}), 400
+    limit = min(max(request.args.get('limit', CALENDAR_PAGE_SIZE, type=int), 1), CALENDAR_PAGE_SIZE)
+
+    key = lambda occurrence: (occurrence[1].strftime("%Y-%m-%d"), occurrence[0]["id"])
+    occurrences = data_manager.get_reminder_occurrences(start, end - timedelta(days=1))
+    if request.args.get('cursor'):
+        try:
+            after = decode_cursor(request.args['cursor'], "occurrences", "date", ("", ""))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        occurrences = [occurrence for occurrence in occurrences if key(occurrence) > after]
+    page = heapq.nsmallest(limit + 1, occurrences, key=key)
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor("occurrences", "date", key(page[-1]))
+
+    reminders = {}
+    records = []
+    for reminder, day in page:
+        if reminder["id"] not in reminders:
+            reminders[reminder["id"]] = {
+                "title": reminder.get("title"),
+                "description": reminder.get("description"),
+                "recurrence": describe_recurrence(reminder.get("recurrence")),
+                "recurrence_kind": recurrence_kind(reminder.get("recurrence") or "None"),
+            }
+        records.append({
+            "id": reminder["id"],
+            "display_date": day.strftime("%Y-%m-%d"),
+            "start_time": reminder.get("start_time"),
+            "end_time": reminder.get("end_time"),
+        })
+    return jsonify({"occurrences": records, "reminders": reminders, "next_cursor": next_cursor})
+
+# Interval trees over timed reminder occurrences and project task ranges
+busy_index = BusyIndex(data_manager)
+
+def _slot_json(start, end, reminder):
+    return {
+        "id": reminder["id"],
+        "title": reminder.get("title"),
+        "start": from_minute(start).isoformat(timespec="minutes"),
+        "end": from_minute(end).isoformat(timespec="minutes"),
+    }
+
+@app.route('/api/calendar/freebusy')
+def calendar_freebusy():
+    """
+    Busy time between start (inclusive) and end (exclusive), given as dates or
+    YYYY-MM-DDTHH:MM. Timed reminders make up the busy blocks; all-day ones do
+    not block time. Open project tasks running in the window are listed apart.
+    """
+    try:
+        start = datetime.fromisoformat(request.args.get('start', ''))
+        end = datetime.fromisoformat(request.args.get('end', ''))
+    except ValueError:
+        return jsonify({"error": "start and end must be YYYY-MM-DD dates or YYYY-MM-DDTHH:MM times"}), 400
+    if not start < end <= start + timedelta(days=CALENDAR_MAX_DAYS):
+        return jsonify({"error": f"The window must span at most {CALENDAR_MAX_DAYS} days"}), 400
+
+    window_start, window_end = to_minute(start), to_minute(end)
+    slots = busy_index.slots(window_start, window_end)
+    busy = []
+    for slot_start, slot_end, reminder in slots:
+        slot_start, slot_end = max(slot_start, window_start), min(slot_end, window_end)
+        if busy and slot_start <= busy[-1][1]:
+            busy[-1][1] = max(busy[-1][1], slot_end)
+        else:
+            busy.append([slot_start, slot_end])
+    end_day = end.date() + timedelta(days=1) if end.time() != datetime.min.time() else end.date()
+    return jsonify({
+        "busy": [{"start": from_minute(s).isoformat(timespec="minutes"), "end": from_minute(e).isoformat(timespec="minutes")} for s, e in busy],
+        "reminders": [_slot_json(*slot) for slot in slots],
+        "tasks": busy_index.tasks(start.date(), end_day),
+    })
+
+@app.route('/api/reminders/calendar.ics')
+def reminders_calendar_feed():
+    """
+    Subscribable iCalendar feed of all reminders. Clients polling with
+    If-None-Match get a 304 without the reminders being read at all.
+    """
+    from flask import Response, stream_with_context
+    etag = _version_etag("reminders", data_manager.data_version("reminders"))
+    if etag_matches(etag):
+        response = Response(status=304)
+    else:
+        reminders = list(data_manager.get_all_reminders())
+        response = Response(stream_with_context(iter_calendar(reminders)), mimetype="text/calendar")
+        response.headers["Content-Disposition"] = "inline; filename=reminders.ics"
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+# Comment lines keep idle connections open through proxies and reveal closed ones
+SSE_KEEPALIVE_SECONDS = 25
+
+@app.route('/api/reminders/stream')
+def reminder_stream():
+    """Server-Sent Events: a "reminder" event whenever a reminder falls due."""
+    from flask import Response
+    reminder_scheduler.start()
+    subscriber = reminder_scheduler.subscribe()
+
+    def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    alert = subscriber.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: reminder\ndata: {app.json.dumps(alert)}\n\n"
+        finally:
+            reminder_scheduler.unsubscribe(subscriber)
+
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.route('/knowledge')
 def knowledge_base():
@@ -529,39 +749,119 @@ def knowledge_base():
 
 @app.route('/api/all_data')
 def get_all_data():
-    return jsonify({
-        "reminders": data_manager.get_all_reminders(),
-        "tasks": data_manager.get_all_tasks()
-    })
+    """
+    Reminders and tasks; collection=reminders or collection=tasks returns one.
+    Filters, sort, paging and fields= apply to each (see query_collection).
+    Paged responses carry a next_cursor per collection; a cursor continues
+    one collection, so pass collection= along with it.
+    """
+    names = [request.args['collection']] if request.args.get('collection') else ["reminders", "tasks"]
+    if any(name not in ("reminders", "tasks") for name in names):
+        return jsonify({"error": "collection must be reminders or tasks"}), 400
+    if request.args.get('cursor') and len(names) > 1:
+        return jsonify({"error": "Pass collection= together with cursor"}), 400
+
+    def payload():
+        result, cursors = {}, {}
+        for name in names:
+            items = data_manager.get_all_reminders() if name == "reminders" else data_manager.get_all_tasks()
+            result[name], cursors[name] = query_collection(items, request.args, name)
+        if is_paged(request.args):
+            result["next_cursor"] = cursors
+        return result
+
+    etag = _version_etag("all", data_manager.data_version("reminders"), data_manager.data_version("tasks"))
+    try:
+        return _conditional_json(etag, payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+def _query_page(items, collection, default_order=None):
+    """A filtered/sorted collection; paged requests get {"items", "next_cursor"}."""
+    page, next_cursor = query_collection(items, request.args, collection, default_order)
+    if is_paged(request.args):
+        return {"items": page, "next_cursor": next_cursor}
+    return page
+
+@app.route('/api/changes')
+def get_changes():
+    """
+    Reminders, tasks, projects and KB items changed since the "version" of an
+    earlier response (all of them when since is missing, the client is too far
+    behind, or another server process answered before: "full" is true then).
+    collections=reminders,tasks limits the answer to some collections.
+    """
+    token, _, seq = request.args.get('since', '').partition('-')
+    since = int(seq) if token == ETAG_TOKEN and seq.isdigit() else None
+    collections = [c for c in request.args.get('collections', '').split(',') if c]
+    unknown = [c for c in collections if c not in CHANGE_COLLECTIONS]
+    if unknown:
+        return jsonify({"error": f"Unknown collections: {', '.join(unknown)}"}), 400
+    changes = data_manager.changes_since(since, collections or CHANGE_COLLECTIONS)
+    changes["version"] = f"{ETAG_TOKEN}-{changes['version']}"
+    return jsonify(changes)
 
 # --- API Routes ---
 
 @app.route('/api/reminders', methods=['POST'])
 def add_reminder():
     data = request.json
-    reminder = data_manager.add_reminder(
-        data['title'], 
-        data['description'], 
-        data['date'], 
-        data['recurrence'],
-        data.get('start_time'),
-        data.get('end_time')
-    )
-    return jsonify(reminder)
+    try:
+        reminder = data_manager.add_reminder(
+            data['title'], 
+            data['description'], 
+            data['date'], 
+            data['recurrence'],
+            data.get('start_time'),
+            data.get('end_time'),
+            data.get('exdates')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(_with_conflicts(reminder))
+
+def _with_conflicts(reminder):
+    """The saved reminder, plus any timed reminders it overlaps from today on."""
+    conflicts = busy_index.conflicts(reminder)
+    if not conflicts:
+        return reminder
+    return dict(reminder, conflicts=[_slot_json(*slot) for slot in conflicts])
 
 @app.route('/api/reminders/<reminder_id>', methods=['PUT'])
 def update_reminder(reminder_id):
     data = request.json
-    reminder = data_manager.update_reminder(
-        reminder_id,
-        data['title'],
-        data['description'],
-        data['date'],
-        data['recurrence'],
-        data.get('start_time'),
-        data.get('end_time')
-    )
-    return jsonify(reminder)
+    try:
+        reminder = data_manager.update_reminder(
+            reminder_id,
+            data['title'],
+            data['description'],
+            data['date'],
+            data['recurrence'],
+            data.get('start_time'),
+            data.get('end_time'),
+            data.get('exdates')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(_with_conflicts(reminder) if reminder else reminder)
+
+# Longest look-ahead /api/reminders/upcoming will project
+MAX_UPCOMING_WEEKS = 520
+
+@app.route('/api/reminders/upcoming')
+def upcoming_reminders():
+    try:
+        weeks = int(request.args.get('weeks', 6))
+    except ValueError:
+        return jsonify({"error": "weeks must be a number"}), 400
+    if weeks < 0:
+        return jsonify({"error": "weeks must not be negative"}), 400
+    weeks = min(weeks, MAX_UPCOMING_WEEKS)
+    reminders = data_manager.get_upcoming_reminders(weeks=weeks)
+    for reminder in reminders:
+        reminder["recurrence_label"] = describe_recurrence(reminder.get("recurrence"))
+        reminder["recurrence_kind"] = recurrence_kind(reminder.get("recurrence") or "None")
+    return jsonify(reminders)
 
 @app.route('/api/tasks', methods=['POST'])
 def add_task():
@@ -620,10 +920,17 @@ def get_csv_template():
     
     output = io.StringIO()
     writer = csv.writer(output)
-    # Header: type, title, description, date/status, recurrence, start_time, end_time
-    writer.writerow(['type', 'title', 'description', 'date_or_status', 'recurrence', 'start_time', 'end_time'])
-    writer.writerow(['reminder', 'Buy Groceries', 'Milk, Bread, Eggs', '2026-01-20', 'Weekly', '10:00', '11:00'])
-    writer.writerow(['task', 'Finish Report', 'Quarterly financial report', 'Yet to Start', '', '', ''])
+    # Header: type, title, description, date/status, recurrence, start_time, end_time,
+    # then ref/parent/start_date/end_date for project and project_task rows.
+    # A project_task's parent is the ref of an earlier project/project_task row or an existing project id.
+    writer.writerow(['type', 'title', 'description', 'date_or_status', 'recurrence', 'start_time', 'end_time', 'ref', 'parent', 'start_date', 'end_date'])
+    writer.writerow(['reminder', 'Buy Groceries', 'Milk, Bread, Eggs', '2026-01-20', 'Weekly', '10:00', '11:00', '', '', '', ''])
+    # Besides None/Daily/Weekly/Monthly/Yearly, recurrence takes an RRULE such as the 2nd Tuesday of every month
+    writer.writerow(['reminder', 'Team Retro', '', '2026-01-13', 'FREQ=MONTHLY;BYDAY=2TU', '15:00', '16:00', '', '', '', ''])
+    writer.writerow(['task', 'Finish Report', 'Quarterly financial report', 'Yet to Start', '', '', '', '', '', '', ''])
+    writer.writerow(['project', 'Website Revamp', 'New landing pages', 'Yet to Start', '', '', '', 'P1', '', '2026-02-01', '2026-04-30'])
+    writer.writerow(['project_task', 'Design', 'Wireframes and mockups', '', '', '', '', 'T1', 'P1', '2026-02-01', '2026-02-28'])
+    writer.writerow(['project_task', 'Homepage mockup', '', '', '', '', '', '', 'T1', '2026-02-05', '2026-02-15'])
     
     return Response(
         output.getvalue(),
@@ -633,8 +940,6 @@ def get_csv_template():
 
 @app.route('/api/bulk-upload', methods=['POST'])
 def bulk_upload():
-    import io
-    import csv
     if 'file' not in request.files:
         return jsonify({"error": "No file part"}), 400
     
@@ -643,60 +948,48 @@ def bulk_upload():
         return jsonify({"error": "No selected file"}), 400
     
     if file and file.filename.endswith('.csv'):
-        stream = io.StringIO(file.stream.read().decode("UTF8"), newline=None)
-        reader = csv.DictReader(stream)
-        
-        imported_count = 0
-        errors = []
-        
-        for row in reader:
-            item_type = row.get('type', '').lower().strip()
-            title = row.get('title', '').strip()
-            description = row.get('description', '').strip()
-            
-            if not title:
-                continue
-                
-            try:
-                if item_type == 'reminder':
-                    data_manager.add_reminder(
-                        title,
-                        description,
-                        row.get('date_or_status', datetime.now().strftime('%Y-%m-%d')),
-                        row.get('recurrence', 'None'),
-                        row.get('start_time'),
-                        row.get('end_time')
-                    )
-                    imported_count += 1
-                elif item_type == 'task':
-                    data_manager.add_task(
-                        title,
-                        description,
-                        row.get('date_or_status', 'Yet to Start')
-                    )
-                    imported_count += 1
-                else:
-                    errors.append(f"Unknown type '{item_type}' for item '{title}'")
-            except Exception as e:
-                errors.append(f"Error importing '{title}': {str(e)}")
+        # Decode and parse the upload as a stream instead of reading it into memory
+        stream = io.TextIOWrapper(file.stream, encoding="utf-8-sig", newline="")
+        result = data_manager.bulk_import(stream)
+        if result["errors"]:
+            return jsonify({
+                "success": False,
+                "error": "Nothing was imported. Fix the rows below and upload again.",
+                "count": 0,
+                "errors": result["errors"]
+            }), 400
         
         return jsonify({
             "success": True, 
-            "count": imported_count, 
-            "errors": errors
+            "count": result["count"], 
+            "imported": result["imported"],
+            "errors": []
         })
     
     return jsonify({"error": "Invalid file type"}), 400
 
 # --- Knowledge Base API ---
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify(data_manager.get_cache_stats())
+
 @app.route('/api/kb', methods=['GET'])
 def get_kb_items():
-    return jsonify(data_manager.get_kb_items())
+    etag = _version_etag("kb", data_manager.data_version("kb"))
+    try:
+        return _conditional_json(etag, lambda: _query_page(data_manager.get_kb_items(), "kb"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 @app.route('/api/kb/search', methods=['GET'])
 def search_kb_items():
     query = request.args.get('q', '')
-    return jsonify(data_manager.search_kb_items(query))
+    # Pages follow relevance unless another sort is asked for
+    relevance = lambda item: (-kb_search_score(item, query.lower()), item.get("created_at") or "")
+    try:
+        return jsonify(_query_page(data_manager.search_kb_items(query), "kb", relevance if query else None))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 @app.route('/api/kb', methods=['POST'])
 def add_kb_item():
@@ -1249,9 +1542,9 @@ def handle_settings():
         data_manager.save_settings(data)
         return jsonify({"success": True})
     else:
-        settings = data_manager.get_settings()
-        settings["background_image_available"] = _find_background_image() is not None
-        return jsonify(settings)
+        background = _find_background_image() is not None
+        etag = _version_etag("settings", data_manager.data_version("settings"), int(background))
+        return _conditional_json(etag, lambda: dict(data_manager.get_settings(), background_image_available=background))
 
 @app.route('/background-image')
 def background_image():
@@ -1296,11 +1589,14 @@ def backup_data():
             os.makedirs(backup_dir)
         
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        # Files identified from data_manager.py
-        files_to_check = ['data.json', 'knowledgebase.json', 'secure.json', 'username.json']
-        backed_up_files = []
-        
+
+        # data.json and knowledgebase.json, or with the SQLite backend a
+        # snapshot of the whole database
+        backed_up_files = data_manager.backup(backup_dir, timestamp)
+
+        # Kept as JSON files by both backends
+        files_to_check = ['secure.json', 'username.json']
+
         for filename in files_to_check:
             src = os.path.join(data_dir, filename)
             if os.path.exists(src):
@@ -1323,9 +1619,20 @@ def project_detail(project_id):
         return redirect(url_for('dashboard'))
     return render_template('project.html', project=project)
 
+def _projects_for_query():
+    # Without their task trees the projects come from the manifest, not every shard
+    fields = request.args.get('fields', '').split(',')
+    if ("*" in fields or "tasks" in fields) or not (is_paged(request.args) or request.args.get('fields')):
+        return data_manager.get_all_projects()
+    return data_manager.get_project_summaries()
+
 @app.route('/api/projects', methods=['GET'])
 def get_projects():
-    return jsonify(data_manager.get_all_projects())
+    etag = _version_etag("projects", data_manager.data_version("projects"))
+    try:
+        return _conditional_json(etag, lambda: _query_page(_projects_for_query(), "projects"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
 @app.route('/api/projects', methods=['POST'])
 def add_project():
@@ -1341,10 +1648,12 @@ def add_project():
 
 @app.route('/api/projects/<project_id>', methods=['GET'])
 def get_project(project_id):
+    etag = _version_etag("project", data_manager.project_version(project_id))
+    # Look it up first: a deleted project is a 404, whatever ETag the client holds
     project = data_manager.get_project(project_id)
-    if project:
-        return jsonify(project)
-    return jsonify({"error": "Project not found"}), 404
+    if not project:
+        return jsonify({"error": "Project not found"}), 404
+    return _conditional_json(etag, lambda: project)
 
 @app.route('/api/projects/<project_id>', methods=['PUT'])
 def update_project(project_id):
@@ -1429,88 +1738,117 @@ def get_parent_task_dates(project_id, task_id):
         return jsonify({"start_date": start_date, "end_date": end_date})
     return jsonify({"error": "Parent task or dates not found"}), 404
 
-@app.route('/api/reminders/download')
-def download_reminders():
-    import io
-    import csv
+# Streamed exports: rows leave in chunks of about this many characters
+CSV_CHUNK_CHARS = 64 * 1024
+
+def _iter_csv(header, rows):
+    """CSV text a chunk at a time, so an export never sits in memory as a whole."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield buffer.getvalue() # The header goes out straight away
+    buffer.seek(0)
+    buffer.truncate()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CSV_CHUNK_CHARS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def _csv_download(filename, header, rows):
+    """A streamed CSV attachment; ?gzip=1 downloads it as a .csv.gz file instead."""
     from flask import Response
-    
-    reminders = data_manager.get_all_reminders()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['id', 'title', 'description', 'date', 'recurrence', 'start_time', 'end_time', 'created_at'])
-    
-    for rem in reminders:
-        writer.writerow([
-            rem.get('id'),
-            rem.get('title'),
-            rem.get('description'),
-            rem.get('date'),
-            rem.get('recurrence'),
-            rem.get('start_time', ''),
-            rem.get('end_time', ''),
-            rem.get('created_at')
-        ])
-    
+    chunks = _iter_csv(header, rows)
+    if request.args.get('gzip') in ('1', 'true'):
+        return Response(
+            compress_stream(chunks, "gzip"),
+            mimetype="application/gzip",
+            headers={"Content-disposition": f"attachment; filename={filename}.gz"}
+        )
     return Response(
-        output.getvalue(),
+        chunks,
         mimetype="text/csv",
-        headers={"Content-disposition": "attachment; filename=reminders_export.csv"}
+        headers={"Content-disposition": f"attachment; filename={filename}"}
     )
 
+@app.route('/api/reminders/download')
+def download_reminders():
+    reminders = list(data_manager.get_all_reminders())
+    rows = ([
+        rem.get('id'),
+        rem.get('title'),
+        rem.get('description'),
+        rem.get('date'),
+        rem.get('recurrence'),
+        rem.get('start_time', ''),
+        rem.get('end_time', ''),
+        rem.get('created_at')
+    ] for rem in reminders)
+    return _csv_download("reminders_export.csv",
+                         ['id', 'title', 'description', 'date', 'recurrence', 'start_time', 'end_time', 'created_at'], rows)
+
 @app.route('/api/tasks/download')
 def download_tasks():
-    import io
-    import csv
-    from flask import Response
-    
-    tasks = data_manager.get_all_tasks()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['id', 'title', 'description', 'status', 'created_at'])
-    
-    for task in tasks:
-        writer.writerow([
-            task.get('id'),
-            task.get('title'),
-            task.get('description'),
-            task.get('status'),
-            task.get('created_at')
-        ])
-    
-    return Response(
-        output.getvalue(),
-        mimetype="text/csv",
-        headers={"Content-disposition": "attachment; filename=tasks_export.csv"}
-    )
+    tasks = list(data_manager.get_all_tasks())
+    rows = ([
+        task.get('id'),
+        task.get('title'),
+        task.get('description'),
+        task.get('status'),
+        task.get('created_at')
+    ] for task in tasks)
+    return _csv_download("tasks_export.csv", ['id', 'title', 'description', 'status', 'created_at'], rows)
 
 @app.route('/api/projects/download')
 def download_projects():
-    import io
-    import csv
-    from flask import Response
-    
-    projects = data_manager.get_all_projects()
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(['id', 'name', 'description', 'start_date', 'end_date', 'status', 'created_at'])
-    
-    for project in projects:
-        writer.writerow([
-            project.get('id'),
-            project.get('name'),
-            project.get('description'),
-            project.get('start_date'),
-            project.get('end_date'),
-            project.get('status'),
-            project.get('created_at')
-        ])
-    
-    return Response(
-        output.getvalue(),
-        mimetype="text/csv",
-        headers={"Content-disposition": "attachment; filename=projects_export.csv"}
-    )
+    projects = data_manager.get_project_summaries()
+    rows = ([
+        project.get('id'),
+        project.get('name'),
+        project.get('description'),
+        project.get('start_date'),
+        project.get('end_date'),
+        project.get('status'),
+        project.get('created_at')
+    ] for project in projects)
+    return _csv_download("projects_export.csv",
+                         ['id', 'name', 'description', 'start_date', 'end_date', 'status', 'created_at'], rows)
+
+@app.route('/api/projects/tasks/download')
+def download_project_tasks():
+    """Every project task on one row, with the path of its parent tasks and its comments."""
+    summaries = data_manager.get_project_summaries()
+
+    def rows():
+        # One project's tree at a time
+        for summary in summaries:
+            project = data_manager.get_project(summary['id'])
+            if not project:
+                continue
+            stack = [(task, []) for task in reversed(project.get('tasks', []))]
+            while stack:
+                task, parents = stack.pop()
+                yield [
+                    project['id'],
+                    project.get('name'),
+                    task.get('id'),
+                    " / ".join(parents),
+                    task.get('name'),
+                    task.get('status'),
+                    task.get('start_date'),
+                    task.get('end_date'),
+                    task.get('comments'),
+                    "\n".join(f"{c.get('timestamp', '')} {c.get('text', '')}" for c in task.get('task_comments', [])),
+                    task.get('created_at')
+                ]
+                path = parents + [task.get('name') or '']
+                stack.extend((sub, path) for sub in reversed(task.get('subtasks', [])))
+
+    return _csv_download("project_tasks_export.csv",
+                         ['project_id', 'project_name', 'task_id', 'parent_path', 'name', 'status',
+                          'start_date', 'end_date', 'comments', 'task_comments', 'created_at'], rows())
 
 @app.route('/api/check_update')
 def check_update():
@@ -1576,4 +1914,6 @@ def check_update():
         return jsonify({"error": str(e), "update_available": False}), 500
 
 if __name__ == '__main__':
+    # Turn SIGTERM into a normal exit so buffered writes are flushed by atexit
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     app.run(debug=False, host="0.0.0.0", port=8000)
@@ -0,0 +1,188 @@
+import base64
+import binascii
+import heapq
+import json
+from datetime import date
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Nested lists left out of paged responses unless named in fields=
+HEAVY_FIELDS = {
+    "reminders": ("comments",),
+    "tasks": ("comments",),
+    "projects": ("tasks",),
+    "kb": (),
+}
+# What start/end filter on: one date field, or a (start, end) range that must overlap
+DATE_FIELDS = {
+    "reminders": "date",
+    "tasks": "created_at",
+    "projects": ("start_date", "end_date"),
+    "kb": "created_at",
+}
+
+
+def is_paged(args):
+    return "limit" in args or "cursor" in args
+
+
+def query_collection(items, args, collection, default_order=None):
+    """
+    Filter, sort, page and project a collection according to request args:
+
+      id, status, project  comma-separated values to keep (project: projects only)
+      start, end           YYYY-MM-DD, inclusive bounds on the collection's date
+      sort                 a field to sort by, "-field" for descending
+      limit, cursor        keyset paging: pass back next_cursor for the next page
+      fields               comma-separated fields to return, "*" for all
+
+    Pages are keyed on the sort value plus the id, so items added or removed
+    between requests never shift a page. Paged results leave out heavy nested
+    fields unless fields= asks for them. default_order(item) gives the order
+    used for paging when no sort is given (creation time otherwise).
+    Returns (items, next_cursor); raises ValueError for bad arguments.
+    """
+    items = _filter(items, args, collection)
+
+    paged = is_paged(args)
+    sort = args.get("sort", "")
+    if sort:
+        field = sort.lstrip("-")
+        reverse = sort.startswith("-")
+        key = lambda item: (_sortable(item.get(field)), str(item.get("id")))
+    elif default_order:
+        reverse = False
+        key = lambda item: (default_order(item), str(item.get("id")))
+    else:
+        reverse = False
+        key = lambda item: (_sortable(item.get("created_at")), str(item.get("id")))
+
+    next_cursor = None
+    if paged:
+        limit = _int_arg(args, "limit", DEFAULT_PAGE_SIZE)
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        if args.get("cursor"):
+            # Sort keys are text; a default order's key is checked against a real one
+            if sort or not default_order:
+                sample = ("", "")
+            else:
+                sample = key(items[0]) if items else None
+            after = decode_cursor(args["cursor"], collection, sort, sample)
+            if reverse:
+                items = [item for item in items if key(item) < after]
+            else:
+                items = [item for item in items if key(item) > after]
+        pick = heapq.nlargest if reverse else heapq.nsmallest
+        page = pick(limit + 1, items, key=key)
+        if len(page) > limit:
+            page = page[:limit]
+            next_cursor = encode_cursor(collection, sort, key(page[-1]))
+        items = page
+    elif sort:
+        items = sorted(items, key=key, reverse=reverse)
+
+    return _project(items, args, collection, paged), next_cursor
+
+
+def _filter(items, args, collection):
+    wanted = {}
+    for name in ("id", "status", "project"):
+        values = _split(args.get(name))
+        if values:
+            if name == "project" and collection != "projects":
+                raise ValueError("The project filter applies to projects only")
+            field = "id" if name == "project" else name
+            wanted[field] = wanted[field] & values if field in wanted else values
+    if wanted:
+        items = [item for item in items if all(item.get(field) in values for field, values in wanted.items())]
+
+    start, end = _date_arg(args, "start"), _date_arg(args, "end")
+    if start or end:
+        start, end = start or "0000-00-00", end or "9999-99-99"
+        fields = DATE_FIELDS[collection]
+        if isinstance(fields, tuple):
+            items = [item for item in items if (item.get(fields[0]) or "")[:10] <= end
+                     and (item.get(fields[1]) or item.get(fields[0]) or "")[:10] >= start]
+        else:
+            items = [item for item in items if start <= (item.get(fields) or "")[:10] <= end]
+    return items
+
+
+def _project(items, args, collection, paged):
+    fields = _split(args.get("fields"))
+    if "*" in fields:
+        return items
+    if fields:
+        fields.add("id")
+        return [{field: item[field] for field in fields if field in item} for item in items]
+    heavy = HEAVY_FIELDS[collection] if paged else ()
+    if not heavy:
+        return items
+    return [{field: value for field, value in item.items() if field not in heavy} for item in items]
+
+
+def encode_cursor(collection, sort, key):
+    """An opaque cursor resuming after key, a (sort value, id) pair."""
+    raw = json.dumps([collection, sort, list(key)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, collection, sort, sample=None):
+    """
+    The key a cursor resumes after. sample is a key of the same order; a cursor
+    whose key has another shape or other types is rejected, since it could not
+    be compared with the items.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_collection, cursor_sort, key = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_collection != collection or cursor_sort != sort:
+        raise ValueError("The cursor belongs to a different collection or sort order")
+    key = _as_tuple(key)
+    if not (isinstance(key, tuple) and len(key) == 2 and isinstance(key[1], str)):
+        raise ValueError("Invalid cursor")
+    if sample is not None and not _same_shape(key, sample):
+        raise ValueError("Invalid cursor")
+    return key
+
+
+def _as_tuple(value):
+    return tuple(_as_tuple(part) for part in value) if isinstance(value, list) else value
+
+
+def _same_shape(value, sample):
+    if isinstance(sample, tuple):
+        return (isinstance(value, tuple) and len(value) == len(sample)
+                and all(_same_shape(v, s) for v, s in zip(value, sample)))
+    if isinstance(sample, (int, float)) and not isinstance(sample, bool):
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    return type(value) is type(sample)
+
+
+def _sortable(value):
+    # Missing values sort first; everything else compares as text
+    return "" if value is None else value if isinstance(value, str) else json.dumps(value)
+
+
+def _split(value):
+    return {part.strip() for part in (value or "").split(",") if part.strip()}
+
+
+def _int_arg(args, name, default):
+    try:
+        return int(args.get(name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def _date_arg(args, name):
+    value = args.get(name)
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"{name} must be a YYYY-MM-DD date")
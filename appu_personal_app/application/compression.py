@@ -0,0 +1,113 @@
+import gzip
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Text formats the app generates that are worth compressing; images and
+# archives already are, and text/event-stream must reach the browser one event
+# at a time. Static files (CSS, JavaScript, SVG) are sent as direct passthrough
+# file responses, which are never compressed, so they are not listed.
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "text/calendar",
+    "text/csv",
+    "text/html",
+    "text/plain",
+}
+# Below this a compressed body saves less than the work costs
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def available_encodings():
+    return ("br", "gzip") if brotli else ("gzip",)
+
+
+def etag_matches(etag):
+    """If-None-Match check that also accepts the tags of compressed copies."""
+    return any(request.if_none_match.contains(etag + suffix) for suffix in ("", "-gzip", "-br"))
+
+
+def init_compression(app, min_size=MIN_SIZE):
+    """
+    Compress responses with brotli (when installed) or gzip, whichever the
+    client prefers. Register it before other after_request hooks so it runs last.
+    Streamed responses are compressed chunk by chunk and flushed as they go.
+    """
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+        if response.status_code == 304:
+            _match_encoded_etag(response)
+            return response
+        if (response.status_code < 200 or response.status_code in (204, 206)
+                or response.direct_passthrough or "Content-Encoding" in response.headers
+                or request.method == "HEAD"):
+            return response
+        encoding = request.accept_encodings.best_match(available_encodings())
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < min_size:
+                return response
+            response.set_data(_compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            # Each encoding is its own representation, with its own strong tag
+            response.set_etag(f"{etag}-{encoding}", weak)
+        return response
+
+    return app
+
+
+def _match_encoded_etag(response):
+    etag, weak = response.get_etag()
+    if not etag:
+        return
+    for encoding in available_encodings():
+        if request.if_none_match.contains(f"{etag}-{encoding}"):
+            response.set_etag(f"{etag}-{encoding}", weak)
+            return
+
+
+def _compress(data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_stream(chunks, encoding):
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, flush, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) # 31: gzip container
+        process, flush, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            # Flush every chunk, so the client sees each one as soon as it is made
+            data = process(chunk) + flush()
+            if data:
+                yield data
+        yield finish()
+    finally:
+        close = getattr(chunks, "close", None)
+        if close:
+            close()
@@ -1,12 +1,28 @@
+import atexit
 import json
 import os
 import uuid
 import base64
+import copy
+import csv
+import shutil
+import functools
+from collections import Counter, deque
+import threading
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
+import json_provider
+from reminder_index import ReminderIndex, next_occurrence, normalize_exdates, validate_recurrence
+
+try:
+    import fcntl
+except ImportError: # Windows: only the in-process lock is available
+    fcntl = None
+
 APP_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(APP_DIR, "..", "data")
 DATA_FILE = os.path.join(DATA_DIR, "data.json")
@@ -14,77 +30,335 @@ KB_FILE = os.path.join(DATA_DIR, "knowledgebase.json")
 SECURE_FILE = os.path.join(DATA_DIR, "secure.json")
 USERNAME_FILE = os.path.join(DATA_DIR, "username.json")
 PROJECT_FILE = os.path.join(DATA_DIR, "project.json")
+# Projects are sharded: one file per project plus a manifest of summaries
+PROJECTS_DIR = os.path.join(DATA_DIR, "projects")
+PROJECT_MANIFEST = os.path.join(DATA_DIR, "project_manifest.json")
 SETTINGS_FILE = os.path.join(DATA_DIR, "settings.json")
 
-class DataManager:
-    def __init__(self, data_file=DATA_FILE):
-        self.data_file = data_file
-        self.load_data()
+DEFAULT_SETTINGS = {
+    "colors": {
+        "nearing_2_weeks": "#F4C430",  # Saffron/Yellow
+        "nearing_1_week": "#E53935",   # Red
+        "overdue": "#8B0000"           # Dark Red
+    },
+    "section_order": ["tasks", "projects", "reminders"],
+    "task_alert_days": 7,
+    "background_image_enabled": False
+}
 
-    def load_data(self):
-        if not os.path.exists(self.data_file):
-            self.data = {"reminders": [], "tasks": []}
-            self.save_data()
-        else:
+# Journal (append-only change log) kept next to data.json. Once it grows past
+# this many bytes it is folded back into a fresh data.json snapshot.
+JOURNAL_SUFFIX = ".log"
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+# Collections stored in a file of their own, for data_version()
+COLLECTION_FILES = {
+    "kb": KB_FILE,
+    "settings": SETTINGS_FILE,
+    "user_name": USERNAME_FILE,
+}
+
+# Marks a file removal buffered by batch() or flush_interval
+_REMOVED = object()
+
+# Collections covered by changes_since(), and how many changes are remembered;
+# clients further behind get a full snapshot instead
+CHANGE_COLLECTIONS = ("reminders", "tasks", "projects", "kb")
+CHANGE_LOG_SIZE = 5000
+
+def _synchronized(method):
+    """Run a DataManager method holding its locks, on data synced with the disk."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._locked():
+            self._sync()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class BaseDataManager:
+    """
+    What every storage backend shares: locking, the settings, user name and
+    secure vault files, write coalescing, the change journal and the item
+    logic built on top of the storage methods. A backend stores reminders,
+    tasks, projects and KB items and provides:
+
+        get_all_reminders, get_reminder_count, get_reminder_occurrences,
+        get_upcoming_reminders, add/update/delete_reminder,
+        get_all_tasks, get_active_tasks, add_task, update_task(_status),
+        delete_task, add_comment, get_latest_comments, _apply_import,
+        load_kb, save_kb, add/update/delete_kb_item, search_kb_items,
+        load_projects, get_project, project_version, get_project_summaries,
+        get_active_projects, get_status_counts, _save_project, delete_project,
+        _current_item, _check_external_changes and backup
+    """
+
+    def __init__(self, lock_file, flush_interval=0, pretty_json=False):
+        # Files are written compact; pretty_json indents them for reading by hand
+        self.pretty_json = pretty_json
+        # Threads in this process serialise on _lock; processes sharing the data
+        # directory serialise on an advisory lock of lock_file (POSIX only)
+        self._lock = threading.RLock()
+        self._lock_file = open(lock_file, 'a')
+        self._flock_depth = 0
+        # Parsed JSON files keyed by path: (file stamp, data)
+        self._file_cache = {}
+        self.cache_stats = {"hits": 0, "misses": 0}
+        # Change counters per collection (or file path), see data_version()
+        self._versions = Counter()
+        # Change journal for changes_since(): (seq, collection, id, deleted)
+        self._change_log = deque(maxlen=CHANGE_LOG_SIZE)
+        self._change_seq = 0
+        self._change_floor = 0
+        self._change_versions = {}
+        # Project id -> (project dict, {task id: (task, parent task or None, depth)})
+        self._task_index = {}
+        # Write coalescing: with flush_interval > 0 (seconds) or inside batch(),
+        # file writes are buffered here and written by flush()
+        self.flush_interval = flush_interval
+        self._pending_files = {}
+        self._batch_depth = 0
+        self._flush_timer = None
+        atexit.register(self.flush)
+
+    # --- Locking ---
+    @contextmanager
+    def _locked(self):
+        """Hold the in-process lock and the cross-process file lock (re-entrant)."""
+        with self._lock:
+            if self._flock_depth == 0 and fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._flock_depth += 1
             try:
-                with open(self.data_file, 'r') as f:
-                    self.data = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                self.data = {"reminders": [], "tasks": []}
+                yield
+            finally:
+                self._flock_depth -= 1
+                if self._flock_depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def refresh(self):
+        """Pick up changes written by other processes. Nothing to do for stores read on every call."""
+
+    def _sync(self):
+        """Bring in-memory state up to date with the store. Call with the lock held."""
+
+    # --- Settings ---
+    def data_version(self, collection):
+        """
+        A value that changes whenever the collection changes, here or in another
+        process, so callers can key caches on it. Cheap: at most a stat() call.
+        """
+        path = COLLECTION_FILES.get(collection)
+        if path is None:
+            return self._versions[collection]
+        self._load_cached(path, None) # Notices a file replaced by another process
+        return self._versions[path]
 
     def get_user_name(self):
-        if not os.path.exists(USERNAME_FILE):
-            return "Appu"
-        try:
-            with open(USERNAME_FILE, 'r') as f:
-                data = json.load(f)
-                return data.get("user_name", "Appu")
-        except (json.JSONDecodeError, IOError):
+        data = self._load_cached(USERNAME_FILE, None)
+        if not isinstance(data, dict):
             return "Appu"
+        return data.get("user_name", "Appu")
 
+    @_synchronized
     def set_user_name(self, name):
-        with open(USERNAME_FILE, 'w') as f:
-            json.dump({"user_name": name}, f, indent=4)
+        self._save_cached(USERNAME_FILE, {"user_name": name})
 
     def get_settings(self):
-        if not os.path.exists(SETTINGS_FILE):
-            default_settings = {
-                "colors": {
-                    "nearing_2_weeks": "#F4C430",  # Saffron/Yellow
-                    "nearing_1_week": "#E53935",   # Red
-                    "overdue": "#8B0000"           # Dark Red
-                },
-                "section_order": ["tasks", "projects", "reminders"],
-                "task_alert_days": 7,
-                "background_image_enabled": False
-            }
-            self.save_settings(default_settings)
-            return default_settings
+        """
+        Settings are served from the file cache, so a template render only costs
+        a stat() of settings.json. Callers get their own copy to modify.
+        """
+        settings = self._load_cached(SETTINGS_FILE, None)
+        if settings is None:
+            if os.path.exists(SETTINGS_FILE):
+                # Unreadable file
+                return {
+                    "colors": {"nearing_2_weeks": "#F4C430", "nearing_1_week": "#E53935", "overdue": "#8B0000"},
+                    "section_order": ["tasks", "projects", "reminders"],
+                    "background_image_enabled": False
+                }
+            return copy.deepcopy(DEFAULT_SETTINGS)
+
+        settings = copy.deepcopy(settings)
+        if "section_order" not in settings:
+            settings["section_order"] = ["tasks", "projects", "reminders"]
+        if "background_image_enabled" not in settings:
+            settings["background_image_enabled"] = False
+        return settings
+
+    @_synchronized
+    def save_settings(self, settings):
+        self._save_cached(SETTINGS_FILE, copy.deepcopy(settings))
+
+    # --- Write coalescing ---
+    def _is_deferring(self):
+        return self._batch_depth > 0 or self.flush_interval > 0
+
+    def _schedule_flush(self):
+        if self._batch_depth or not self.flush_interval:
+            return # The outermost batch() flushes on exit
+        with self._lock:
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    @contextmanager
+    def batch(self):
+        """
+        Buffer every change made inside the block and write it once at the end.
+        The locks are held for the whole block, so a batch is atomic for other
+        threads and processes. (flush_interval buffering is not: only use it
+        with a single worker process.)
+        """
+        with self._locked():
+            self._sync()
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.flush()
+
+    def flush(self):
+        """Write out everything buffered by batch() or flush_interval."""
+        with self._locked():
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            files = self._pending_files
+            self._pending_files = {}
+            for path, data in files.items():
+                if data is _REMOVED:
+                    self._remove_file(path)
+                else:
+                    self._write_file(path, data)
+
+    # --- Change journal ---
+    def _record_change(self, collection, item_id, deleted=False):
+        with self._lock:
+            self._change_seq += 1
+            self._change_log.append((self._change_seq, collection, item_id, deleted))
+
+    def _reset_changes(self):
+        """Record a change that cannot be itemised; every client resyncs from a snapshot."""
+        with self._lock:
+            self._change_seq += 1
+            self._change_floor = self._change_seq
+
+    def changes_since(self, since, collections=CHANGE_COLLECTIONS):
+        """
+        What changed after change version `since`, per collection, as current
+        items ("upserted") and ids ("deleted"). With since=None, or when the
+        changes since then are no longer all remembered, every item is returned
+        and "full" is True.
+        """
+        with self._lock:
+            self._check_external_changes()
+            version = self._change_seq
+            oldest = self._change_log[0][0] if self._change_log else version + 1
+            result = {"version": version, "full": False}
+            if since is None or since < self._change_floor or since > version or since + 1 < oldest:
+                result["full"] = True
+                for collection in collections:
+                    items = {
+                        "reminders": self.get_all_reminders,
+                        "tasks": self.get_all_tasks,
+                        "projects": self.get_all_projects,
+                        "kb": self.get_kb_items,
+                    }[collection]()
+                    result[collection] = {"upserted": list(items), "deleted": []}
+                return result
+
+            latest = {}
+            for seq, collection, item_id, deleted in reversed(self._change_log):
+                if seq <= since:
+                    break
+                if collection in collections:
+                    latest.setdefault((collection, item_id), deleted)
+            for collection in collections:
+                result[collection] = {"upserted": [], "deleted": []}
+            for (collection, item_id), deleted in latest.items():
+                item = None if deleted else self._current_item(collection, item_id)
+                if item is None:
+                    result[collection]["deleted"].append(item_id)
+                else:
+                    result[collection]["upserted"].append(item)
+            return result
+
+    # --- File cache ---
+    def _load_cached(self, path, default):
+        """
+        Return the parsed contents of a JSON file, re-reading it only when it
+        was replaced or changed. Callers share (and may mutate) the cached object,
+        so every change must be written back through _save_cached.
+        """
+        pending = self._pending_files.get(path)
+        if pending is not None:
+            self.cache_stats["hits"] += 1
+            return default if pending is _REMOVED else pending
+        stamp = _file_stamp(path)
+        if stamp is None:
+            if self._file_cache.pop(path, None) is not None:
+                self._bump_file(path)
+            return default
+        cached = self._file_cache.get(path)
+        if cached and cached[0] == stamp:
+            self.cache_stats["hits"] += 1
+            return cached[1]
+
+        self.cache_stats["misses"] += 1
+        self._bump_file(path)
         try:
-            with open(SETTINGS_FILE, 'r') as f:
-                settings = json.load(f)
-                if "section_order" not in settings:
-                    settings["section_order"] = ["tasks", "projects", "reminders"]
-                if "background_image_enabled" not in settings:
-                    settings["background_image_enabled"] = False
-                return settings
+            data = json_provider.load_file(path)
         except (json.JSONDecodeError, IOError):
-            return {
-                "colors": {"nearing_2_weeks": "#F4C430", "nearing_1_week": "#E53935", "overdue": "#8B0000"},
-                "section_order": ["tasks", "projects", "reminders"],
-                "background_image_enabled": False
-            }
+            return default
+        self._file_cache[path] = (stamp, data)
+        return data
 
-    def save_settings(self, settings):
-        with open(SETTINGS_FILE, 'w') as f:
-            json.dump(settings, f, indent=4)
+    def _bump_file(self, path):
+        self._versions[path] += 1
 
-    def save_data(self):
-        with open(self.data_file, 'w') as f:
-            json.dump(self.data, f, indent=4)
+    def _save_cached(self, path, data):
+        self._bump_file(path)
+        if self._is_deferring():
+            with self._lock:
+                self._pending_files[path] = data
+            self._schedule_flush()
+            return
+        self._write_file(path, data)
+
+    def _write_file(self, path, data):
+        _write_atomic(path, self._dumps(data))
+        self._file_cache[path] = (_file_stamp(path), data)
+
+    def _delete_cached(self, path):
+        if self._is_deferring():
+            with self._lock:
+                self._pending_files[path] = _REMOVED
+            self._schedule_flush()
+            return
+        self._remove_file(path)
+
+    def _remove_file(self, path):
+        self._file_cache.pop(path, None)
+        self._bump_file(path)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def get_cache_stats(self):
+        return dict(self.cache_stats, files=len(self._file_cache))
+
+    def _dumps(self, data):
+        return json_provider.dumpb(data, pretty=self.pretty_json)
 
     # --- Reminders ---
-    def add_reminder(self, title, description, date_str, recurrence, start_time=None, end_time=None):
+    def _new_reminder(self, title, description, date_str, recurrence, start_time=None, end_time=None, exdates=None):
+        # recurrence is a simple name (Daily, Weekly, ...) or an RRULE string
+        _parse_import_date(date_str, "date")
+        validate_recurrence(recurrence)
         reminder = {
             "id": str(uuid.uuid4()),
             "title": title,
@@ -96,158 +370,47 @@ class DataManager:
             "created_at": datetime.now().isoformat(),
             "comments": []
         }
-        self.data["reminders"].append(reminder)
-        self.save_data()
+        exdates = normalize_exdates(exdates)
+        if exdates:
+            reminder["exdates"] = exdates
         return reminder
 
-    def get_upcoming_reminders(self, weeks=1):
-        """
-        Get reminders occurring within the next 'weeks' weeks.
-        Handles recurrence by dynamically projecting dates.
-        """
-        upcoming = []
-        today = datetime.now().date()
-        end_date = today + timedelta(weeks=weeks)
-        
-        for reminder in self.data["reminders"]:
-            try:
-                rem_date = datetime.strptime(reminder["date"], "%Y-%m-%d").date()
-            except ValueError:
-                continue
-
-            # If it's a past one-time reminder, skip (unless we want to show missed ones, but 'upcoming' usually implies future)
-            # However, for recurring, we need to find the next occurrence relative to today.
-            
-            next_occurrence = self._get_next_occurrence(rem_date, reminder["recurrence"], today)
-            
-            if next_occurrence and today <= next_occurrence <= end_date:
-                # Return a copy with the calculated display date
-                rem_copy = reminder.copy()
-                rem_copy["display_date"] = next_occurrence.strftime("%Y-%m-%d")
-                upcoming.append(rem_copy)
-
-        # Sort by display_date
-        upcoming.sort(key=lambda x: x["display_date"])
-        return upcoming
-    
     def _get_next_occurrence(self, start_date, recurrence, relative_to):
         """
         Calculate the next occurrence of a reminder after or on 'relative_to' date.
         """
-        if recurrence == "None":
-            return start_date if start_date >= relative_to else None
-        
-        current_occurrence = start_date
-        
-        while current_occurrence < relative_to:
-            if recurrence == "Daily":
-                current_occurrence += timedelta(days=1)
-            elif recurrence == "Weekly":
-                current_occurrence += timedelta(weeks=1)
-            elif recurrence == "Monthly":
-                year = current_occurrence.year
-                month = current_occurrence.month
-                day = current_occurrence.day
-                month += 1
-                if month > 12:
-                    month = 1
-                    year += 1
-                import calendar
-                _, last_day = calendar.monthrange(year, month)
-                new_day = min(day, last_day)
-                current_occurrence = current_occurrence.replace(year=year, month=month, day=new_day)
-            elif recurrence == "Yearly":
-                try:
-                    current_occurrence = current_occurrence.replace(year=current_occurrence.year + 1)
-                except ValueError:
-                    current_occurrence = current_occurrence.replace(year=current_occurrence.year + 1, day=28)
-        
-        return current_occurrence
+        return next_occurrence(start_date, recurrence, relative_to)
 
     def get_projected_reminders(self, start_date_obj, end_date_obj):
         """
         Project all occurrences of all reminders between start_date_obj and end_date_obj.
         """
-        projected = []
-        for reminder in self.data["reminders"]:
-            try:
-                base_date = datetime.strptime(reminder["date"], "%Y-%m-%d").date()
-            except ValueError:
-                continue
-
-            recurrence = reminder["recurrence"]
-            
-            if recurrence == "None":
-                if start_date_obj <= base_date <= end_date_obj:
-                    rem_copy = reminder.copy()
-                    rem_copy["display_date"] = base_date.strftime("%Y-%m-%d")
-                    projected.append(rem_copy)
-                continue
-
-            # For recurring reminders, find all occurrences in range
-            current = base_date
-            
-            # Catch up to or start from the earliest needed date
-            if current < start_date_obj:
-                current = self._get_next_occurrence(base_date, recurrence, start_date_obj)
-            
-            # Collect all until end_date
-            while current <= end_date_obj:
-                rem_copy = reminder.copy()
-                rem_copy["display_date"] = current.strftime("%Y-%m-%d")
-                projected.append(rem_copy)
-                
-                # Advance to next occurrence
-                if recurrence == "Daily":
-                    current += timedelta(days=1)
-                elif recurrence == "Weekly":
-                    current += timedelta(weeks=1)
-                elif recurrence == "Monthly":
-                    year = current.year
-                    month = current.month
-                    day = base_date.day # Always try to use the original day
-                    month += 1
-                    if month > 12:
-                        month = 1
-                        year += 1
-                    import calendar
-                    _, last_day = calendar.monthrange(year, month)
-                    new_day = min(day, last_day)
-                    current = current.replace(year=year, month=month, day=new_day)
-                elif recurrence == "Yearly":
-                    try:
-                        current = current.replace(year=current.year + 1)
-                    except ValueError:
-                        current = current.replace(year=current.year + 1, day=28)
-                else:
-                    break # Should not happen for proyected cases we handle
-        
-        return projected
+        occurrences = self.get_reminder_occurrences(start_date_obj, end_date_obj)
+        return [_with_display_date(reminder, day) for reminder, day in occurrences]
 
-    def get_all_reminders(self):
-        return self.data["reminders"]
-        
-    def delete_reminder(self, reminder_id):
-        self.data["reminders"] = [r for r in self.data["reminders"] if r["id"] != reminder_id]
-        self.save_data()
-
-    def update_reminder(self, reminder_id, title, description, date_str, recurrence, start_time=None, end_time=None):
-        for reminder in self.data["reminders"]:
-            if reminder["id"] == reminder_id:
-                reminder["title"] = title
-                reminder["description"] = description
-                reminder["date"] = date_str
-                reminder["recurrence"] = recurrence
-                reminder["start_time"] = start_time
-                reminder["end_time"] = end_time
-                # We don't necessarily update created_at
-                self.save_data()
-                return reminder
-        return None
+    def _apply_reminder_update(self, reminder, title, description, date_str, recurrence, start_time, end_time, exdates):
+        # Validate everything before touching the stored reminder
+        _parse_import_date(date_str, "date")
+        validate_recurrence(recurrence)
+        if exdates is not None:
+            exdates = normalize_exdates(exdates)
+        reminder["title"] = title
+        reminder["description"] = description
+        reminder["date"] = date_str
+        reminder["recurrence"] = recurrence
+        reminder["start_time"] = start_time
+        reminder["end_time"] = end_time
+        # exdates=None keeps the current exception dates
+        if exdates is not None:
+            if exdates:
+                reminder["exdates"] = exdates
+            else:
+                reminder.pop("exdates", None)
+        # We don't necessarily update created_at
 
     # --- Tasks ---
-    def add_task(self, title, description, status="Yet to Start"):
-        task = {
+    def _new_task(self, title, description, status="Yet to Start"):
+        return {
             "id": str(uuid.uuid4()),
             "title": title,
             "description": description,
@@ -255,144 +418,107 @@ class DataManager:
             "created_at": datetime.now().isoformat(),
             "comments": []
         }
-        self.data["tasks"].append(task)
-        self.save_data()
-        return task
 
-    def get_active_tasks(self):
-        return [t for t in self.data["tasks"] if t["status"] != "Completed"]
-    
-    def get_all_tasks(self):
-        return self.data["tasks"]
+    # --- Bulk Import ---
+    @_synchronized
+    def bulk_import(self, lines):
+        """
+        Import reminders, tasks, projects and project tasks from CSV text (any
+        iterable of lines, e.g. a file object). Rows are parsed and validated one
+        at a time; nothing is saved unless every row is valid, and then all of
+        them are persisted in a single write.
+        """
+        reader = csv.DictReader(lines)
+        state = {"reminders": [], "tasks": [], "projects": [], "project_tasks": [], "attach": [], "refs": {}}
+        errors = []
+        try:
+            for row in reader:
+                row = {key.strip().lower(): (value or "").strip() for key, value in row.items() if key is not None}
+                if not any(row.values()):
+                    continue
+                try:
+                    self._stage_import_row(row, state)
+                except ValueError as e:
+                    errors.append(f"Row {reader.line_num}: {e}")
+        except (csv.Error, UnicodeDecodeError) as e:
+            errors.append(f"Row {reader.line_num}: {e}")
 
-    def update_task_status(self, task_id, new_status):
-        for task in self.data["tasks"]:
-            if task["id"] == task_id:
-                task["status"] = new_status
-                self.save_data()
-                return True
-        return False
+        if errors:
+            return {"count": 0, "imported": {}, "errors": errors}
 
-    def update_task(self, task_id, title, description, status):
-        for task in self.data["tasks"]:
-            if task["id"] == task_id:
-                task["title"] = title
-                task["description"] = description
-                task["status"] = status
-                self.save_data()
-                return task
-        return None
-        
-    def delete_task(self, task_id):
-        self.data["tasks"] = [t for t in self.data["tasks"] if t["id"] != task_id]
-        self.save_data()
+        self._apply_import(state)
+        imported = {name: len(state[name]) for name in ("reminders", "tasks", "projects", "project_tasks")}
+        return {"count": sum(imported.values()), "imported": imported, "errors": []}
 
-    # --- Comments ---
-    def add_comment(self, item_type, item_id, text):
-        if item_type == 'task':
-            items = self.data["tasks"]
-        elif item_type == 'reminder':
-            items = self.data["reminders"]
-        else:
-            return None
+    def _stage_import_row(self, row, state):
+        """Validate one CSV row and build its item. Raises ValueError with the reason."""
+        item_type = row.get("type", "").lower()
+        title = row.get("title", "")
+        description = row.get("description", "")
+        if not title:
+            raise ValueError("Title is required")
 
-        for item in items:
-            if item["id"] == item_id:
-                comment = {
-                    "text": text,
-                    "timestamp": datetime.now().isoformat()
-                }
-                item.setdefault("comments", []).append(comment)
-                self.save_data()
-                return comment
-        return None
+        if item_type == "reminder":
+            date_str = row.get("date_or_status") or datetime.now().strftime("%Y-%m-%d")
+            _parse_import_date(date_str, "date")
+            recurrence = row.get("recurrence") or "None"
+            start_time = _parse_import_time(row.get("start_time"), "start_time")
+            end_time = _parse_import_time(row.get("end_time"), "end_time")
+            state["reminders"].append(self._new_reminder(title, description, date_str, recurrence, start_time, end_time))
+            return
 
-    def get_latest_comments(self, limit=5):
-        all_comments = []
-        for r in self.data["reminders"]:
-            for c in r.get("comments", []):
-                all_comments.append({
-                    "text": c["text"],
-                    "timestamp": c["timestamp"],
-                    "item_title": r["title"],
-                    "item_type": "Reminder"
-                })
-        for t in self.data["tasks"]:
-            for c in t.get("comments", []):
-                all_comments.append({
-                    "text": c["text"],
-                    "timestamp": c["timestamp"],
-                    "item_title": t["title"],
-                    "item_type": "Task"
-                })
-        
-        all_comments.sort(key=lambda x: x["timestamp"], reverse=True)
-        return all_comments[:limit]
+        if item_type == "task":
+            state["tasks"].append(self._new_task(title, description, row.get("date_or_status") or "Yet to Start"))
+            return
 
-    # --- Knowledge Base ---
-    def load_kb(self):
-        if not os.path.exists(KB_FILE):
-            return []
-        try:
-            with open(KB_FILE, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return []
+        if item_type not in ("project", "project_task"):
+            raise ValueError(f"Unknown type '{item_type}' for item '{title}'")
 
-    def save_kb(self, kb_data):
-        with open(KB_FILE, 'w') as f:
-            json.dump(kb_data, f, indent=4)
+        start_date = row.get("start_date")
+        end_date = row.get("end_date")
+        if _parse_import_date(start_date, "start_date") > _parse_import_date(end_date, "end_date"):
+            raise ValueError("start_date is after end_date")
+        ref = row.get("ref")
+        if ref and ref in state["refs"]:
+            raise ValueError(f"Duplicate ref '{ref}'")
 
-    def get_kb_items(self):
-        return self.load_kb()
+        status = row.get("date_or_status") or "Yet to Start"
+        if item_type == "project":
+            node = self._new_project(title, description, start_date, end_date, status)
+            state["projects"].append(node)
+        else:
+            parent_ref = row.get("parent")
+            if not parent_ref:
+                raise ValueError("project_task rows need a parent (a project/task ref or an existing project id)")
+            if parent_ref in state["refs"]:
+                parent = state["refs"][parent_ref]
+                is_new_parent = True
+            else:
+                parent = self.get_project(parent_ref)
+                is_new_parent = False
+                if not parent:
+                    raise ValueError(f"Unknown parent '{parent_ref}'")
 
-    def add_kb_item(self, title, data, url):
-        kb_data = self.load_kb()
-        item = {
-            "id": str(uuid.uuid4()),
-            "title": title,
-            "data": data,
-            "url": url,
-            "created_at": datetime.now().isoformat()
-        }
-        kb_data.append(item)
-        self.save_kb(kb_data)
-        return item
+            p_start, p_end = parent.get("start_date"), parent.get("end_date")
+            if p_start and p_end and (start_date < p_start or end_date > p_end):
+                raise ValueError(f"Task dates must be within parent/project range ({p_start} - {p_end})")
 
-    def update_kb_item(self, kb_id, title, data, url):
-        kb_data = self.load_kb()
-        for item in kb_data:
-            if item["id"] == kb_id:
-                item["title"] = title
-                item["data"] = data
-                item["url"] = url
-                self.save_kb(kb_data)
-                return item
-        return None
-
-    def delete_kb_item(self, kb_id):
-        kb_data = self.load_kb()
-        kb_data = [item for item in kb_data if item["id"] != kb_id]
-        self.save_kb(kb_data)
-        return True
+            parent_task_id = parent["id"] if "subtasks" in parent else None
+            node = self._new_project_task(title, description, start_date, end_date, parent_task_id, status)
+            state["project_tasks"].append(node)
+            if not is_new_parent:
+                state["attach"].append((parent["id"], node))
+            elif parent_task_id:
+                parent["subtasks"].append(node)
+            else:
+                parent["tasks"].append(node)
 
-    def search_kb_items(self, query):
-        kb_data = self.load_kb()
-        if not query:
-            return kb_data
+        if ref:
+            state["refs"][ref] = node
 
-        query = query.lower()
-        results = []
-        for item in kb_data:
-            title_score = item["title"].lower().count(query)
-            data_score = item["data"].lower().count(query)
-            total_score = (title_score * 2) + data_score
-            
-            if total_score > 0:
-                results.append((item, total_score))
-        
-        results.sort(key=lambda x: x[1], reverse=True)
-        return [r[0] for r in results]
+    # --- Knowledge Base ---
+    def get_kb_items(self):
+        return self.load_kb()
 
     # --- Secure Vault ---
     
@@ -409,16 +535,15 @@ class DataManager:
     def load_secure_data(self):
         if not os.path.exists(SECURE_FILE):
             return None
-        with open(SECURE_FILE, 'r') as f:
-            return json.load(f)
+        return json_provider.load_file(SECURE_FILE)
 
     def save_secure_data(self, data):
-        with open(SECURE_FILE, 'w') as f:
-            json.dump(data, f, indent=4)
+        _write_atomic(SECURE_FILE, self._dumps(data))
 
     def is_secure_vault_initialized(self):
         return os.path.exists(SECURE_FILE)
 
+    @_synchronized
     def init_secure_vault(self, master_key):
         """Initializes the secure vault with a master key."""
         if self.is_secure_vault_initialized():
@@ -476,6 +601,7 @@ class DataManager:
                 pass # Skip items that fail to decrypt (shouldn't happen if key is valid)
         return decrypted_items
 
+    @_synchronized
     def add_secure_item(self, master_key, item_data):
         f = self.validate_master_key(master_key)
         if not f:
@@ -499,6 +625,7 @@ class DataManager:
         item_data['id'] = new_item['id']
         return item_data
 
+    @_synchronized
     def update_secure_item(self, master_key, item_id, item_data):
         f = self.validate_master_key(master_key)
         if not f:
@@ -517,6 +644,7 @@ class DataManager:
                 return item_data
         return None
 
+    @_synchronized
     def delete_secure_item(self, master_key, item_id):
         f = self.validate_master_key(master_key)
         if not f:
@@ -528,25 +656,25 @@ class DataManager:
         return True
 
     # --- Projects ---
-    def load_projects(self):
-        if not os.path.exists(PROJECT_FILE):
-            return []
-        try:
-            with open(PROJECT_FILE, 'r') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, IOError):
-            return []
-
-    def save_projects(self, projects):
-        with open(PROJECT_FILE, 'w') as f:
-            json.dump(projects, f, indent=4)
-
     def get_all_projects(self):
         return self.load_projects()
 
-    def add_project(self, name, description, start_date, end_date, status):
-        projects = self.load_projects()
-        project = {
+    # --- Dashboard ---
+    def get_dashboard_summary(self, weeks):
+        """The dashboard's section counters, without walking completed items."""
+        tasks = self.get_status_counts("tasks")
+        projects = self.get_status_counts("projects")
+        return {
+            "tasks_active": sum(tasks.values()) - tasks.get("Completed", 0),
+            "tasks_done": tasks.get("Completed", 0),
+            "projects_active": sum(projects.values()) - projects.get("Completed", 0),
+            "projects_done": projects.get("Completed", 0),
+            "reminders_upcoming": len(self.get_upcoming_reminders(weeks=weeks)),
+            "reminders_total": self.get_reminder_count(),
+        }
+
+    def _new_project(self, name, description, start_date, end_date, status):
+        return {
             "id": str(uuid.uuid4()),
             "name": name,
             "description": description,
@@ -556,73 +684,79 @@ class DataManager:
             "created_at": datetime.now().isoformat(),
             "tasks": []
         }
-        projects.append(project)
-        self.save_projects(projects)
-        return project
 
-    def get_project(self, project_id):
-        projects = self.load_projects()
-        for project in projects:
-            if project["id"] == project_id:
-                return project
-        return None
+    @_synchronized
+    def add_project(self, name, description, start_date, end_date, status):
+        project = self._new_project(name, description, start_date, end_date, status)
+        self._save_project(project)
+        return project
 
+    @_synchronized
     def update_project(self, project_id, name, description, start_date, end_date, status):
-        projects = self.load_projects()
-        for project in projects:
-            if project["id"] == project_id:
-                # Validate completion - can't complete if tasks aren't completed
-                if status == "Completed":
-                    if not self._are_all_tasks_completed(project):
-                        return {"error": "Cannot complete project. All tasks must be completed first."}
-                
-                project["name"] = name
-                project["description"] = description
-                project["start_date"] = start_date
-                project["end_date"] = end_date
-                project["status"] = status
-                self.save_projects(projects)
-                return project
-        return None
+        project = self.get_project(project_id)
+        if not project:
+            return None
+        result = self._apply_project_update(project, name, description, start_date, end_date, status)
+        if "error" not in result:
+            self._save_project(project)
+        return result
 
-    def delete_project(self, project_id):
-        projects = self.load_projects()
-        projects = [p for p in projects if p["id"] != project_id]
-        self.save_projects(projects)
-        return True
+    def _apply_project_update(self, project, name, description, start_date, end_date, status):
+        # Validate completion - can't complete if tasks aren't completed
+        if status == "Completed":
+            if not self._are_all_tasks_completed(project):
+                return {"error": "Cannot complete project. All tasks must be completed first."}
+        
+        project["name"] = name
+        project["description"] = description
+        project["start_date"] = start_date
+        project["end_date"] = end_date
+        project["status"] = status
+        return project
 
+    @_synchronized
     def add_project_task(self, project_id, task_name, comments, start_date, end_date, parent_task_id=None):
-        projects = self.load_projects()
-        for project in projects:
-            if project["id"] == project_id:
-                task = {
-                    "id": str(uuid.uuid4()),
-                    "name": task_name,
-                    "comments": comments,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "status": "Yet to Start",
-                    "parent_id": parent_task_id,
-                    "subtasks": [],
-                    "created_at": datetime.now().isoformat(),
-                    "task_comments": []
-                }
-                # Validate dates against parent or project
-                p_start, p_end = self.get_parent_dates_for_validation(project, parent_task_id)
-                if p_start and p_end:
-                    if start_date < p_start or end_date > p_end:
-                         return {"error": f"Task dates must be within parent/project range ({p_start} - {p_end})"}
-
-                if parent_task_id:
-                    # Find parent task and add as subtask
-                    parent = self._find_task_in_project(project, parent_task_id)
-                    if parent:
-                        parent["subtasks"].append(task)
-                else:
-                    project["tasks"].append(task)
-                self.save_projects(projects)
-                return task
-        return None
+        project = self.get_project(project_id)
+        if not project:
+            return None
+        task = self._apply_add_project_task(project, task_name, comments, start_date, end_date, parent_task_id)
+        if "error" not in task:
+            self._save_project(project)
+        return task
+
+    def _new_project_task(self, task_name, comments, start_date, end_date, parent_task_id=None, status="Yet to Start"):
+        return {
+            "id": str(uuid.uuid4()),
+            "name": task_name,
+            "comments": comments,
+            "start_date": start_date,
+            "end_date": end_date,
+            "status": status,
+            "parent_id": parent_task_id,
+            "subtasks": [],
+            "created_at": datetime.now().isoformat(),
+            "task_comments": []
+        }
+
+    def _apply_add_project_task(self, project, task_name, comments, start_date, end_date, parent_task_id):
+        task = self._new_project_task(task_name, comments, start_date, end_date, parent_task_id)
+        # Validate dates against parent or project
+        p_start, p_end = self.get_parent_dates_for_validation(project, parent_task_id)
+        if p_start and p_end:
+            if start_date < p_start or end_date > p_end:
+                 return {"error": f"Task dates must be within parent/project range ({p_start} - {p_end})"}
+
+        nodes = self._task_nodes(project)
+        if parent_task_id:
+            # Find parent task and add as subtask
+            parent_node = nodes.get(parent_task_id)
+            if parent_node:
+                parent_node[0]["subtasks"].append(task)
+                nodes[task["id"]] = (task, parent_node[0], parent_node[2] + 1)
+        else:
+            project["tasks"].append(task)
+            nodes[task["id"]] = (task, None, 0)
+        return task
 
     def get_parent_dates_for_validation(self, project, parent_task_id):
         if not parent_task_id:
@@ -633,43 +767,44 @@ class DataManager:
             return parent.get("start_date"), parent.get("end_date")
         return None, None
 
+    def _task_nodes(self, project):
+        """
+        Flattened index of the project's task tree: task id -> (task, parent task
+        or None, depth). Built once per loaded project object and kept in step by
+        the project task mutators.
+        """
+        entry = self._task_index.get(project["id"])
+        if entry is None or entry[0] is not project:
+            nodes = {}
+            stack = [(task, None, 0) for task in reversed(project.get("tasks", []))]
+            while stack:
+                task, parent, depth = stack.pop()
+                nodes.setdefault(task["id"], (task, parent, depth))
+                stack.extend((sub, task, depth + 1) for sub in reversed(task.get("subtasks", [])))
+            entry = (project, nodes)
+            self._task_index[project["id"]] = entry
+        return entry[1]
+
     def _find_task_in_project(self, project, task_id):
-        """Recursively find a task in project's task tree"""
-        for task in project["tasks"]:
-            if task["id"] == task_id:
-                return task
-            found = self._find_task_in_subtasks(task, task_id)
-            if found:
-                return found
-        return None
+        """Find a task anywhere in the project's task tree"""
+        node = self._task_nodes(project).get(task_id)
+        return node[0] if node else None
 
     def get_parent_task_dates(self, project_id, task_id):
         """Get parent task's start and end dates for a given task"""
         project = self.get_project(project_id)
         if not project:
             return None, None
-        
-        task = self._find_task_in_project(project, task_id)
-        if not task or not task.get("parent_id"):
+        return self._parent_dates_of(project, task_id)
+
+    def _parent_dates_of(self, project, task_id):
+        node = self._task_nodes(project).get(task_id)
+        if not node or not node[1]:
             # Top-level task, return project dates
             return project.get("start_date"), project.get("end_date")
         
-        # Find parent task
-        parent = self._find_task_in_project(project, task["parent_id"])
-        if parent:
-            return parent.get("start_date"), parent.get("end_date")
-        
-        return None, None
-
-    def _find_task_in_subtasks(self, parent_task, task_id):
-        """Recursively search in subtasks"""
-        for subtask in parent_task.get("subtasks", []):
-            if subtask["id"] == task_id:
-                return subtask
-            found = self._find_task_in_subtasks(subtask, task_id)
-            if found:
-                return found
-        return None
+        parent = node[1]
+        return parent.get("start_date"), parent.get("end_date")
 
     def _are_all_children_completed(self, task):
         """Check if all subtasks of a task are completed"""
@@ -695,75 +830,908 @@ class DataManager:
                 return False
         return True
 
+    @_synchronized
     def update_project_task(self, project_id, task_id, task_name=None, comments=None, start_date=None, end_date=None, status=None):
-        projects = self.load_projects()
-        for project in projects:
-            if project["id"] == project_id:
-                task = self._find_task_in_project(project, task_id)
-                if task:
-                    # Validate completion - can't complete if children aren't completed
-                    if status == "Completed":
-                        if not self._are_all_children_completed(task):
-                            return {"error": "Cannot complete task. All subtasks must be completed first."}
-                    
-                    if task_name is not None:
-                        task["name"] = task_name
-                    if comments is not None:
-                        task["comments"] = comments
-                    if start_date is not None:
-                        task["start_date"] = start_date
-                    if end_date is not None:
-                        task["end_date"] = end_date
-                    if status is not None:
-                        task["status"] = status
-                    self.save_projects(projects)
-                    return task
-        return None
+        project = self.get_project(project_id)
+        if not project:
+            return None
+        result = self._apply_project_task_update(project, task_id, task_name, comments, start_date, end_date, status)
+        if result and "error" not in result:
+            self._save_project(project)
+        return result
 
+    def _apply_project_task_update(self, project, task_id, task_name, comments, start_date, end_date, status):
+        task = self._find_task_in_project(project, task_id)
+        if not task:
+            return None
+        # Validate completion - can't complete if children aren't completed
+        if status == "Completed":
+            if not self._are_all_children_completed(task):
+                return {"error": "Cannot complete task. All subtasks must be completed first."}
+        
+        if task_name is not None:
+            task["name"] = task_name
+        if comments is not None:
+            task["comments"] = comments
+        if start_date is not None:
+            task["start_date"] = start_date
+        if end_date is not None:
+            task["end_date"] = end_date
+        if status is not None:
+            task["status"] = status
+        return task
+
+    @_synchronized
     def delete_project_task(self, project_id, task_id):
-        projects = self.load_projects()
-        for project in projects:
-            if project["id"] == project_id:
-                # Remove from top-level tasks
-                project["tasks"] = [t for t in project["tasks"] if t["id"] != task_id]
-                # Remove from subtasks recursively
-                for task in project["tasks"]:
-                    self._remove_task_from_subtasks(task, task_id)
-                self.save_projects(projects)
-                return True
-        return False
-
-    def _remove_task_from_subtasks(self, parent_task, task_id):
-        """Recursively remove task from subtasks"""
-        if "subtasks" in parent_task:
-            parent_task["subtasks"] = [t for t in parent_task["subtasks"] if t["id"] != task_id]
-            for subtask in parent_task["subtasks"]:
-                self._remove_task_from_subtasks(subtask, task_id)
+        project = self.get_project(project_id)
+        if not project:
+            return False
+        self._apply_delete_project_task(project, task_id)
+        self._save_project(project)
+        return True
+
+    def _apply_delete_project_task(self, project, task_id):
+        nodes = self._task_nodes(project)
+        node = nodes.get(task_id)
+        if not node:
+            return
+        task, parent, _ = node
+        siblings = parent["subtasks"] if parent else project["tasks"]
+        siblings[:] = [t for t in siblings if t is not task]
+        # Drop the removed subtree from the index
+        stack = [task]
+        while stack:
+            removed = stack.pop()
+            nodes.pop(removed["id"], None)
+            stack.extend(removed.get("subtasks", []))
 
+    @_synchronized
     def add_project_task_comment(self, project_id, task_id, text):
-        projects = self.load_projects()
-        for project in projects:
-            if project["id"] == project_id:
-                task = self._find_task_in_project(project, task_id)
-                if task:
-                    comment = {
-                        "text": text,
-                        "timestamp": datetime.now().isoformat()
-                    }
-                    if "task_comments" not in task:
-                        task["task_comments"] = []
-                    task["task_comments"].append(comment)
-                    self.save_projects(projects)
-                    return comment
-        return None
+        project = self.get_project(project_id)
+        if not project:
+            return None
+        comment = self._apply_project_task_comment(project, task_id, text)
+        if comment:
+            self._save_project(project)
+        return comment
+
+    def _apply_project_task_comment(self, project, task_id, text):
+        task = self._find_task_in_project(project, task_id)
+        if not task:
+            return None
+        comment = {
+            "text": text,
+            "timestamp": datetime.now().isoformat()
+        }
+        if "task_comments" not in task:
+            task["task_comments"] = []
+        task["task_comments"].append(comment)
+        return comment
 
+    @_synchronized
     def update_project_task_status(self, project_id, task_id, status):
-        projects = self.load_projects()
-        for project in projects:
-            if project["id"] == project_id:
-                task = self._find_task_in_project(project, task_id)
-                if task:
-                    task["status"] = status
-                    self.save_projects(projects)
-                    return True
-        return False
+        project = self.get_project(project_id)
+        if not project or not self._apply_project_task_status(project, task_id, status):
+            return False
+        self._save_project(project)
+        return True
+
+    def _apply_project_task_status(self, project, task_id, status):
+        task = self._find_task_in_project(project, task_id)
+        if not task:
+            return False
+        task["status"] = status
+        return True
+
+
+class DataManager(BaseDataManager):
+    """
+    Reminders and tasks in data.json plus an append-only journal, the KB in
+    knowledgebase.json and projects sharded one file per project.
+    """
+
+    def __init__(self, data_file=DATA_FILE, journal=True, compact_threshold=JOURNAL_COMPACT_BYTES, flush_interval=0, pretty_json=False):
+        super().__init__(data_file + ".lock", flush_interval, pretty_json)
+        self.data_file = data_file
+        self.journal = journal
+        self.journal_file = data_file + JOURNAL_SUFFIX
+        self.compact_threshold = compact_threshold
+        # Compactions have a lock of their own, so writers are not held up by one
+        self._compact_lock = threading.Lock()
+        self._compact_lock_file = open(data_file + ".compact.lock", 'a')
+        self._compacting = False
+        # What we last read from disk, to notice writes from other processes
+        self._data_stamp = None
+        self._journal_seen = (None, 0)
+        self._projects_dir_stamp = None
+        # Reminder start dates and next occurrences, for date-window queries
+        self._reminder_index = ReminderIndex()
+        # Dashboard views, kept in step with every task change: task id -> status,
+        # status -> count and the tasks that are not completed
+        self._task_statuses = {}
+        self._task_counts = Counter()
+        self._active_tasks = {}
+        # Project counts and active summaries, recomputed only when the manifest changes
+        self._project_view = (None, Counter(), [])
+        # Reminder/task records buffered by batch() or flush_interval
+        self._pending = {}
+        self.load_data()
+
+    # --- Locking ---
+    @contextmanager
+    def _compaction(self, blocking=True):
+        """
+        Hold the compaction lock, in this process and across processes. Yields
+        False instead of waiting when blocking=False and a compaction is running.
+        """
+        if not self._compact_lock.acquire(blocking):
+            yield False
+            return
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(self._compact_lock_file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    yield False
+                    return
+            try:
+                yield True
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._compact_lock_file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._compact_lock.release()
+
+    def refresh(self):
+        """
+        Pick up reminder/task changes written by other processes. The common
+        case costs two stat() calls; the lock is only taken when something changed.
+        """
+        if self._changed_on_disk():
+            with self._locked():
+                self._sync()
+
+    def _changed_on_disk(self):
+        if _file_stamp(self.data_file) != self._data_stamp:
+            return True
+        if not self.journal:
+            return False
+        stamp = _file_stamp(self.journal_file)
+        if stamp is None:
+            return self._journal_seen[0] is not None
+        return (stamp[0], stamp[2]) != self._journal_seen
+
+    def _sync(self):
+        """Bring self.data up to date with the disk. Call with the lock held."""
+        if _file_stamp(self.data_file) != self._data_stamp:
+            self.load_data()
+        elif self.journal:
+            self._replay_journal_tail()
+
+    def load_data(self):
+        with self._locked():
+            self._data_stamp = _file_stamp(self.data_file)
+            exists = self._data_stamp is not None
+            if not exists:
+                self.data = {"reminders": [], "tasks": []}
+            else:
+                try:
+                    self.data = json_provider.load_file(self.data_file)
+                except (json.JSONDecodeError, IOError):
+                    self.data = {"reminders": [], "tasks": []}
+
+            self._replay_journal()
+            self._rebuild_index()
+            # A leftover rotated journal means a compaction was interrupted; without
+            # journaling any leftover journal is folded into data.json right away
+            leftover = self.journal_file + ".old" if self.journal else self.journal_file
+            if not exists or os.path.exists(leftover):
+                # Never wait for the compaction lock while holding the data lock
+                self.compact(blocking=False)
+
+    # --- Journal ---
+    def _replay_journal(self):
+        """Apply the journal records written since the last snapshot on top of self.data."""
+        self._journal_seen = (None, 0)
+        paths = [p for p in (self.journal_file + ".old", self.journal_file) if os.path.exists(p)]
+        if not paths:
+            return
+
+        # Dicts keep insertion order, so replaying into them preserves list order
+        collections = {
+            name: {item["id"]: item for item in self.data.get(name, [])}
+            for name in ("reminders", "tasks")
+        }
+        for path in paths:
+            records, offset, inode = _read_journal(path)
+            for record in records:
+                items = collections.get(record.get("collection"))
+                if items is None:
+                    continue
+                if record.get("item") is None:
+                    items.pop(record["id"], None)
+                else:
+                    items[record["id"]] = record["item"]
+            if path == self.journal_file:
+                self._journal_seen = (inode, offset)
+
+        for name, items in collections.items():
+            self.data[name] = list(items.values())
+
+    def _replay_journal_tail(self):
+        """Apply records other processes appended since we last read the journal."""
+        stamp = _file_stamp(self.journal_file)
+        seen_inode, offset = self._journal_seen
+        if stamp is None:
+            if seen_inode is not None:
+                self.load_data() # Journal was folded into a new snapshot
+            return
+        if stamp[0] != seen_inode:
+            if seen_inode is not None:
+                self.load_data()
+                return
+            offset = 0
+        if stamp[2] == offset:
+            return
+
+        records, offset, inode = _read_journal(self.journal_file, offset)
+        for record in records:
+            if record.get("collection") not in self._items:
+                continue
+            if record.get("item") is None:
+                self._detach_item(record["collection"], record["id"])
+            else:
+                self._attach_item(record["collection"], record["item"])
+            # Another process's write; our own are recorded by _commit
+            self._record_change(record["collection"], record["id"], deleted=record.get("item") is None)
+        self._journal_seen = (inode, offset)
+
+    # --- Id index ---
+    def _rebuild_index(self):
+        """
+        Map id -> item and id -> list position for reminders and tasks.
+        Positions at or after _stale_from[collection] may be off after a delete
+        and are recomputed lazily the next time a position is needed.
+        """
+        self._items = {}
+        self._positions = {}
+        self._stale_from = {}
+        for collection in ("reminders", "tasks"):
+            items = self.data.setdefault(collection, [])
+            self._items[collection] = {item["id"]: item for item in items}
+            self._positions[collection] = {item["id"]: pos for pos, item in enumerate(items)}
+            self._stale_from[collection] = len(items)
+            self._versions[collection] += 1
+        self._reset_changes() # Reloaded from disk: no way to tell what changed
+        self._reminder_index.rebuild(self.data["reminders"])
+        self._task_statuses = {}
+        self._task_counts = Counter()
+        self._active_tasks = {}
+        for task in self.data["tasks"]:
+            self._track_task(task["id"], task)
+
+    def _track_task(self, task_id, task):
+        """Update the task status counters and active view; task=None for a delete."""
+        old_status = self._task_statuses.pop(task_id, None)
+        if old_status is not None:
+            self._task_counts[old_status] -= 1
+        self._active_tasks.pop(task_id, None)
+        if task is not None:
+            status = task.get("status")
+            self._task_statuses[task_id] = status
+            self._task_counts[status] += 1
+            if status != "Completed":
+                self._active_tasks[task_id] = task
+
+    def _get_item(self, collection, item_id):
+        return self._items[collection].get(item_id)
+
+    def _position_of(self, collection, item_id):
+        items = self.data[collection]
+        positions = self._positions[collection]
+        if positions[item_id] >= self._stale_from[collection]:
+            for i in range(self._stale_from[collection], len(items)):
+                positions[items[i]["id"]] = i
+            self._stale_from[collection] = len(items)
+        return positions[item_id]
+
+    def _attach_item(self, collection, item):
+        """Add or replace an item in memory and in the index, without persisting it."""
+        items = self.data[collection]
+        if item["id"] in self._items[collection]:
+            items[self._position_of(collection, item["id"])] = item
+        else:
+            self._positions[collection][item["id"]] = len(items)
+            items.append(item)
+        self._items[collection][item["id"]] = item
+        self._versions[collection] += 1
+        if collection == "reminders":
+            self._reminder_index.put(item)
+        else:
+            self._track_task(item["id"], item)
+
+    def _detach_item(self, collection, item_id):
+        """Remove an item from memory and from the index, without persisting it."""
+        if item_id not in self._items[collection]:
+            return False
+        pos = self._position_of(collection, item_id)
+        del self._items[collection][item_id]
+        del self._positions[collection][item_id]
+        del self.data[collection][pos]
+        self._stale_from[collection] = min(self._stale_from[collection], pos)
+        self._versions[collection] += 1
+        if collection == "reminders":
+            self._reminder_index.discard(item_id)
+        else:
+            self._track_task(item_id, None)
+        return True
+
+    def _insert_item(self, collection, item):
+        self._attach_item(collection, item)
+        self._commit(collection, item["id"], item)
+
+    def _remove_item(self, collection, item_id):
+        if not self._detach_item(collection, item_id):
+            return False
+        self._commit(collection, item_id)
+        return True
+
+    def _commit(self, collection, item_id, item=None):
+        """
+        Persist a change to a single reminder or task. item=None records a delete.
+        In journal mode only the changed item is appended to the log.
+        """
+        self._versions[collection] += 1
+        self._record_change(collection, item_id, deleted=item is None)
+        if item is not None:
+            # Date, recurrence or status may have been edited in place
+            if collection == "reminders":
+                self._reminder_index.put(item)
+            else:
+                self._track_task(item_id, item)
+        if self._is_deferring():
+            with self._lock:
+                # Only the latest state of each item needs to reach the disk
+                self._pending[(collection, item_id)] = item
+            self._schedule_flush()
+            return
+        self._write_records([(collection, item_id, item)])
+
+    def _write_records(self, records):
+        if not self.journal:
+            self.save_data()
+            return
+
+        lines = b"".join(
+            json_provider.dumpb({"collection": collection, "id": item_id, "item": item}) + b"\n"
+            for collection, item_id, item in records
+        )
+        with self._locked():
+            with open(self.journal_file, 'ab') as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size > self._journal_seen[1] and stat.st_ino == self._journal_seen[0]:
+                    # Start on a fresh line after a torn append from a crashed writer
+                    lines = b"\n" + lines
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+            self._journal_seen = (stat.st_ino, size)
+
+        if size > self.compact_threshold and not self._compacting:
+            self._compacting = True
+            threading.Thread(target=self._background_compact, daemon=True).start()
+
+    def _background_compact(self):
+        try:
+            self.compact(blocking=False) # Skip if another process is at it
+        finally:
+            self._compacting = False
+
+    def compact(self, blocking=True):
+        """
+        Fold the journal into a fresh data.json snapshot and drop the journal.
+        Under the data lock the journal is rotated to .old and the data
+        serialised. The snapshot is written to disk after the lock is released,
+        while new appends go to a fresh journal; only swapping it in and
+        dropping .old take the lock again, so readers see both or neither.
+        """
+        with self._compaction(blocking) as acquired:
+            if not acquired:
+                return
+            old_journal = self.journal_file + ".old"
+            with self._locked():
+                self._sync()
+                # A .old left by an interrupted compaction is already in self.data;
+                # it is dropped below, and the journal rotated next time
+                if os.path.exists(self.journal_file) and not os.path.exists(old_journal):
+                    os.replace(self.journal_file, old_journal)
+                    self._journal_seen = (None, 0)
+                snapshot = self._dumps(self.data)
+            tmp_file = _write_temp(self.data_file, snapshot)
+            with self._locked():
+                os.replace(tmp_file, self.data_file)
+                self._data_stamp = _file_stamp(self.data_file)
+                if os.path.exists(old_journal):
+                    os.remove(old_journal)
+
+    def save_data(self):
+        if self.journal:
+            self.compact()
+        else:
+            with self._locked():
+                self._write_snapshot(self._dumps(self.data))
+
+    def _write_snapshot(self, data):
+        _write_atomic(self.data_file, data)
+        self._data_stamp = _file_stamp(self.data_file)
+
+    def backup(self, backup_dir, timestamp):
+        """
+        Copy data.json (with the journal folded in) and the knowledge base into
+        backup_dir as <name>_<timestamp>.json. Returns the file names written.
+        """
+        self.compact()
+        written = []
+        with self._locked():
+            for src in (self.data_file, KB_FILE):
+                if os.path.exists(src):
+                    name = os.path.splitext(os.path.basename(src))[0]
+                    dst = os.path.join(backup_dir, f"{name}_{timestamp}.json")
+                    shutil.copy2(src, dst)
+                    written.append(os.path.basename(dst))
+        return written
+
+    def data_version(self, collection):
+        if collection == "projects":
+            # Shards are renamed into place, so the directory changes with every save
+            stamp = _file_stamp(PROJECTS_DIR)
+            if stamp != self._projects_dir_stamp:
+                self._projects_dir_stamp = stamp
+                self._versions["projects"] += 1
+            return self._versions["projects"]
+        return super().data_version(collection)
+
+    def _bump_file(self, path):
+        super()._bump_file(path)
+        if path == PROJECT_MANIFEST or os.path.dirname(path) == PROJECTS_DIR:
+            self._versions["projects"] += 1
+
+    # --- Write coalescing ---
+    def flush(self):
+        with self._locked():
+            records = [(collection, item_id, item) for (collection, item_id), item in self._pending.items()]
+            if records and self._changed_on_disk():
+                # Take in other processes' writes first; our buffered changes win
+                self._sync()
+                for collection, item_id, item in records:
+                    if item is None:
+                        self._detach_item(collection, item_id)
+                    else:
+                        self._attach_item(collection, item)
+            self._pending = {}
+            if records:
+                self._write_records(records)
+            files = bool(self._pending_files)
+            super().flush()
+            if files:
+                # These writes were recorded as changes already
+                for collection in ("kb", "projects"):
+                    if collection in self._change_versions:
+                        self._change_versions[collection] = self.data_version(collection)
+
+    # --- Change journal ---
+    def _record_change(self, collection, item_id, deleted=False):
+        with self._lock:
+            super()._record_change(collection, item_id, deleted)
+            if collection in ("kb", "projects"):
+                # Our own write; anything else moving the version came from elsewhere
+                self._change_versions[collection] = self.data_version(collection)
+
+    def _check_external_changes(self):
+        # Other processes rewrite the KB file and project shards without telling us
+        for collection in ("kb", "projects"):
+            version = self.data_version(collection)
+            if self._change_versions.setdefault(collection, version) != version:
+                self._change_versions[collection] = version
+                self._reset_changes()
+
+    def _current_item(self, collection, item_id):
+        if collection == "projects":
+            return self.get_project(item_id)
+        if collection == "kb":
+            return next((item for item in self.load_kb() if item["id"] == item_id), None)
+        return self._items[collection].get(item_id)
+
+    # --- Reminders ---
+    @_synchronized
+    def add_reminder(self, title, description, date_str, recurrence, start_time=None, end_time=None, exdates=None):
+        reminder = self._new_reminder(title, description, date_str, recurrence, start_time, end_time, exdates)
+        self._insert_item("reminders", reminder)
+        return reminder
+
+    def get_upcoming_reminders(self, weeks=1):
+        """
+        Get reminders occurring within the next 'weeks' weeks.
+        Handles recurrence by dynamically projecting dates.
+        """
+        today = datetime.now().date()
+        with self._lock:
+            upcoming = self._reminder_index.upcoming(today, today + timedelta(weeks=weeks))
+        return [_with_display_date(reminder, day) for reminder, day in upcoming]
+
+    def get_reminder_occurrences(self, start_date_obj, end_date_obj):
+        """(reminder, date) for every occurrence in the window; reminders are not copied."""
+        with self._lock:
+            return self._reminder_index.between(start_date_obj, end_date_obj)
+
+    def get_all_reminders(self):
+        return self.data["reminders"]
+
+    def get_reminder_count(self):
+        return len(self.data["reminders"])
+
+    @_synchronized
+    def delete_reminder(self, reminder_id):
+        self._remove_item("reminders", reminder_id)
+
+    @_synchronized
+    def update_reminder(self, reminder_id, title, description, date_str, recurrence, start_time=None, end_time=None, exdates=None):
+        reminder = self._get_item("reminders", reminder_id)
+        if not reminder:
+            return None
+        self._apply_reminder_update(reminder, title, description, date_str, recurrence, start_time, end_time, exdates)
+        self._commit("reminders", reminder_id, reminder)
+        return reminder
+
+    # --- Tasks ---
+    @_synchronized
+    def add_task(self, title, description, status="Yet to Start"):
+        task = self._new_task(title, description, status)
+        self._insert_item("tasks", task)
+        return task
+
+    def get_active_tasks(self):
+        with self._lock:
+            # Keep list order without walking the completed tasks
+            ids = sorted(self._active_tasks, key=lambda task_id: self._position_of("tasks", task_id))
+            return [self._active_tasks[task_id] for task_id in ids]
+
+    def get_all_tasks(self):
+        return self.data["tasks"]
+
+    @_synchronized
+    def update_task_status(self, task_id, new_status):
+        task = self._get_item("tasks", task_id)
+        if not task:
+            return False
+        task["status"] = new_status
+        self._commit("tasks", task_id, task)
+        return True
+
+    @_synchronized
+    def update_task(self, task_id, title, description, status):
+        task = self._get_item("tasks", task_id)
+        if not task:
+            return None
+        task["title"] = title
+        task["description"] = description
+        task["status"] = status
+        self._commit("tasks", task_id, task)
+        return task
+
+    @_synchronized
+    def delete_task(self, task_id):
+        self._remove_item("tasks", task_id)
+
+    # --- Comments ---
+    @_synchronized
+    def add_comment(self, item_type, item_id, text):
+        if item_type == 'task':
+            collection = "tasks"
+        elif item_type == 'reminder':
+            collection = "reminders"
+        else:
+            return None
+        item = self._get_item(collection, item_id)
+        if not item:
+            return None
+        comment = {
+            "text": text,
+            "timestamp": datetime.now().isoformat()
+        }
+        item.setdefault("comments", []).append(comment)
+        self._commit(collection, item_id, item)
+        return comment
+
+    # --- Bulk Import ---
+    def _apply_import(self, state):
+        with self.batch():
+            for reminder in state["reminders"]:
+                self._insert_item("reminders", reminder)
+            for task in state["tasks"]:
+                self._insert_item("tasks", task)
+            for project in state["projects"]:
+                self._save_project(project)
+            for project_id, task in state["attach"]:
+                project = self.get_project(project_id)
+                if project:
+                    project["tasks"].append(task)
+                    self._task_index.pop(project_id, None)
+                    self._save_project(project)
+
+    def get_latest_comments(self, limit=5):
+        all_comments = []
+        for r in self.data["reminders"]:
+            for c in r.get("comments", []):
+                all_comments.append({
+                    "text": c["text"],
+                    "timestamp": c["timestamp"],
+                    "item_title": r["title"],
+                    "item_type": "Reminder"
+                })
+        for t in self.data["tasks"]:
+            for c in t.get("comments", []):
+                all_comments.append({
+                    "text": c["text"],
+                    "timestamp": c["timestamp"],
+                    "item_title": t["title"],
+                    "item_type": "Task"
+                })
+        
+        all_comments.sort(key=lambda x: x["timestamp"], reverse=True)
+        return all_comments[:limit]
+
+    # --- Knowledge Base ---
+    def load_kb(self):
+        return self._load_cached(KB_FILE, [])
+
+    def save_kb(self, kb_data):
+        self._save_cached(KB_FILE, kb_data)
+
+    @_synchronized
+    def add_kb_item(self, title, data, url):
+        kb_data = self.load_kb()
+        item = {
+            "id": str(uuid.uuid4()),
+            "title": title,
+            "data": data,
+            "url": url,
+            "created_at": datetime.now().isoformat()
+        }
+        kb_data.append(item)
+        self.save_kb(kb_data)
+        self._record_change("kb", item["id"])
+        return item
+
+    @_synchronized
+    def update_kb_item(self, kb_id, title, data, url):
+        kb_data = self.load_kb()
+        for item in kb_data:
+            if item["id"] == kb_id:
+                item["title"] = title
+                item["data"] = data
+                item["url"] = url
+                self.save_kb(kb_data)
+                self._record_change("kb", kb_id)
+                return item
+        return None
+
+    @_synchronized
+    def delete_kb_item(self, kb_id):
+        kb_data = self.load_kb()
+        kb_data = [item for item in kb_data if item["id"] != kb_id]
+        self.save_kb(kb_data)
+        self._record_change("kb", kb_id, deleted=True)
+        return True
+
+    def search_kb_items(self, query):
+        kb_data = self.load_kb()
+        if not query:
+            return kb_data
+
+        query = query.lower()
+        results = []
+        for item in kb_data:
+            total_score = kb_search_score(item, query)
+            if total_score > 0:
+                results.append((item, total_score))
+        
+        results.sort(key=lambda x: x[1], reverse=True)
+        return [r[0] for r in results]
+
+    # --- Projects ---
+    def _project_path(self, project_id):
+        # Ids come from URLs, so never let one point outside the shard directory
+        if not project_id or not all(c.isalnum() or c in "-_" for c in project_id):
+            return None
+        return os.path.join(PROJECTS_DIR, project_id + ".json")
+
+    def _load_manifest(self):
+        if _file_stamp(PROJECT_MANIFEST) is None and os.path.exists(PROJECT_FILE):
+            self._migrate_project_file()
+        return self._load_cached(PROJECT_MANIFEST, [])
+
+    def _migrate_project_file(self):
+        """Split a legacy single-file project.json into per-project shards."""
+        with self._locked():
+            if os.path.exists(PROJECT_MANIFEST) or not os.path.exists(PROJECT_FILE):
+                return # Another process got here first
+            try:
+                projects = json_provider.load_file(PROJECT_FILE)
+            except (json.JSONDecodeError, IOError):
+                return
+            os.makedirs(PROJECTS_DIR, exist_ok=True)
+            migrated = []
+            for project in projects:
+                path = self._project_path(project.get("id"))
+                if path is None:
+                    # No shard name can be made from the id; it stays in the .migrated copy
+                    print(f"Skipping project {project.get('name')!r}: invalid id {project.get('id')!r}")
+                    continue
+                self._write_file(path, project)
+                migrated.append(project)
+            self._write_file(PROJECT_MANIFEST, [_project_summary(p) for p in migrated])
+            # Keep the old file around as a backup, out of the way of future loads
+            os.replace(PROJECT_FILE, PROJECT_FILE + ".migrated")
+
+    def load_projects(self):
+        projects = []
+        for summary in self._load_manifest():
+            project = self.get_project(summary["id"])
+            if project:
+                projects.append(project)
+        return projects
+
+    def get_project_summaries(self):
+        """Projects without their task trees, read from the manifest alone."""
+        return self._load_manifest()
+
+    def get_active_projects(self):
+        return self._current_project_view()[2]
+
+    def _current_project_view(self):
+        manifest = self._load_manifest()
+        version = self._versions[PROJECT_MANIFEST]
+        view = self._project_view
+        if view[0] != version:
+            counts = Counter(project.get("status") for project in manifest)
+            active = [project for project in manifest if project.get("status") != "Completed"]
+            view = self._project_view = (version, counts, active)
+        return view
+
+    # --- Dashboard ---
+    def get_status_counts(self, collection):
+        """{status: count} for "tasks" or "projects"."""
+        if collection == "projects":
+            counts = self._current_project_view()[1]
+        else:
+            counts = self._task_counts
+        return {status: n for status, n in counts.items() if n}
+
+    def _save_project(self, project):
+        """Write one project's shard, touching the manifest only if its summary changed."""
+        os.makedirs(PROJECTS_DIR, exist_ok=True)
+        self._save_cached(self._project_path(project["id"]), project)
+        self._save_project_summary(project)
+        # Only now, so the versions both writes moved count as our own
+        self._record_change("projects", project["id"])
+
+    def _save_project_summary(self, project):
+        manifest = self._load_manifest()
+        summary = _project_summary(project)
+        for i, entry in enumerate(manifest):
+            if entry["id"] == project["id"]:
+                if entry == summary:
+                    return
+                manifest[i] = summary
+                break
+        else:
+            manifest.append(summary)
+        self._save_cached(PROJECT_MANIFEST, manifest)
+
+    def project_version(self, project_id):
+        """Like data_version(), for a single project's shard."""
+        path = self._project_path(project_id)
+        if not path:
+            return None
+        self._load_cached(path, None)
+        return self._versions[path]
+
+    def get_project(self, project_id):
+        path = self._project_path(project_id)
+        if not path:
+            return None
+        self._load_manifest() # Make sure a legacy project.json has been split
+        return self._load_cached(path, None)
+
+    @_synchronized
+    def delete_project(self, project_id):
+        path = self._project_path(project_id)
+        manifest = self._load_manifest()
+        remaining = [p for p in manifest if p["id"] != project_id]
+        if path and len(remaining) != len(manifest):
+            self._delete_cached(path)
+            self._save_cached(PROJECT_MANIFEST, remaining)
+            self._record_change("projects", project_id, deleted=True)
+        self._task_index.pop(project_id, None)
+        return True
+
+
+def _with_display_date(reminder, day):
+    rem_copy = reminder.copy()
+    rem_copy["display_date"] = day.strftime("%Y-%m-%d")
+    return rem_copy
+
+
+def _project_summary(project):
+    """The manifest entry for a project: everything except its task tree."""
+    return {key: value for key, value in project.items() if key != "tasks"}
+
+
+def _parse_import_date(value, field):
+    try:
+        return datetime.strptime(value or "", "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {field} '{value}', expected YYYY-MM-DD")
+
+
+def _parse_import_time(value, field):
+    if not value:
+        return None
+    try:
+        datetime.strptime(value, "%H:%M")
+    except ValueError:
+        raise ValueError(f"Invalid {field} '{value}', expected HH:MM")
+    return value
+
+
+def kb_search_score(item, query):
+    """Relevance of a KB item for a lower-cased query: title hits count double."""
+    return item["title"].lower().count(query) * 2 + item["data"].lower().count(query)
+
+
+def _file_stamp(path):
+    """Identity of a file's current contents, or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def _write_atomic(path, data):
+    """Write via a temp file and rename, so readers never see a half-written file."""
+    os.replace(_write_temp(path, data), path)
+
+
+def _write_temp(path, data):
+    """Write and sync the temp file _write_atomic renames over path; returns its name."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    tmp_file = path + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    return tmp_file
+
+
+def _read_journal(path, offset=0):
+    """
+    Parse the complete journal records from offset onwards. Returns the records,
+    the offset just past the last complete line and the file's inode.
+    """
+    records = []
+    with open(path, 'rb') as f:
+        inode = os.fstat(f.fileno()).st_ino
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b"\n"):
+                break # Append still in progress (or torn by a crash)
+            offset += len(line)
+            try:
+                records.append(json_provider.loads(line))
+            except ValueError:
+                continue
+    return records, offset, inode
@@ -0,0 +1,152 @@
+from datetime import datetime, timedelta, timezone
+
+from reminder_index import is_rule, normalize_exdates, parse_date, parse_rule, parse_time, WEEKDAYS
+
+PRODID = "-//Axolotl//Reminders//EN"
+
+
+def iter_calendar(reminders, name="Reminders"):
+    """
+    Yield an iCalendar (RFC 5545) document for the reminders, one chunk per event.
+    Recurrences are written as RRULEs, so clients expand them themselves.
+    """
+    yield _lines(
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:" + PRODID,
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        "X-WR-CALNAME:" + _escape(name),
+    )
+    for reminder in reminders:
+        event = _event(reminder)
+        if event:
+            yield event
+    yield _lines("END:VCALENDAR")
+
+
+def _event(reminder):
+    start = parse_date(reminder.get("date"))
+    if start is None:
+        return None
+    start_time = parse_time(reminder.get("start_time"))
+    end_time = parse_time(reminder.get("end_time"))
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{reminder['id']}@axolotl",
+        "DTSTAMP:" + _dtstamp(reminder.get("created_at")),
+        "SUMMARY:" + _escape(reminder.get("title") or ""),
+    ]
+    if reminder.get("description"):
+        lines.append("DESCRIPTION:" + _escape(reminder["description"]))
+    if start_time:
+        # Floating local times, like the app itself
+        begin = datetime.combine(start, start_time)
+        end = datetime.combine(start, end_time) if end_time and end_time > start_time else begin + timedelta(hours=1)
+        lines.append("DTSTART:" + begin.strftime("%Y%m%dT%H%M%S"))
+        lines.append("DTEND:" + end.strftime("%Y%m%dT%H%M%S"))
+    else:
+        lines.append("DTSTART;VALUE=DATE:" + start.strftime("%Y%m%d"))
+        lines.append("DTEND;VALUE=DATE:" + (start + timedelta(days=1)).strftime("%Y%m%d"))
+
+    rrule = _rrule(reminder.get("recurrence"), start, start_time)
+    if rrule:
+        lines.append("RRULE:" + rrule)
+        if reminder.get("recurrence") == "Yearly" and (start.month, start.day) == (2, 29):
+            # DTSTART is off the rule; list it as well for clients that only
+            # count the dates a rule matches
+            lines.append(("RDATE:" if start_time else "RDATE;VALUE=DATE:") + _date_value(start, start_time))
+        exdates = [_date_value(parse_date(value), start_time) for value in _safe_exdates(reminder.get("exdates"))]
+        if exdates:
+            prefix = "EXDATE:" if start_time else "EXDATE;VALUE=DATE:"
+            lines.append(prefix + ",".join(exdates))
+    lines.append("END:VEVENT")
+    return _lines(*lines)
+
+
+def _rrule(recurrence, start, start_time):
+    if recurrence == "Daily":
+        return "FREQ=DAILY"
+    if recurrence == "Weekly":
+        return "FREQ=WEEKLY"
+    if recurrence == "Monthly":
+        if start.day <= 28:
+            return "FREQ=MONTHLY"
+        # The app moves the 29th-31st to the last day of shorter months
+        return f"FREQ=MONTHLY;BYMONTHDAY={start.day},-1;BYSETPOS=1"
+    if recurrence == "Yearly":
+        if start.month == 2 and start.day == 29:
+            # The app moves Feb 29 to Feb 28 in the first short year and keeps
+            # it there, leap years included; DTSTART still gives the first 29th
+            return "FREQ=YEARLY;BYMONTH=2;BYMONTHDAY=28"
+        return "FREQ=YEARLY"
+    if not is_rule(recurrence):
+        return None
+    try:
+        rule = parse_rule(recurrence)
+    except ValueError:
+        return None
+
+    parts = [f"FREQ={rule['freq']}"]
+    if rule["interval"] > 1:
+        parts.append(f"INTERVAL={rule['interval']}")
+    if rule["byday"]:
+        parts.append("BYDAY=" + ",".join(f"{nth or ''}{WEEKDAYS[weekday]}" for nth, weekday in rule["byday"]))
+    if rule["bymonthday"]:
+        parts.append("BYMONTHDAY=" + ",".join(str(day) for day in rule["bymonthday"]))
+    if rule["bymonth"]:
+        parts.append("BYMONTH=" + ",".join(str(month) for month in rule["bymonth"]))
+    if rule["count"]:
+        parts.append(f"COUNT={rule['count']}")
+    if rule["until"]:
+        # UNTIL has to match DTSTART's value type
+        until = rule["until"].strftime("%Y%m%d")
+        parts.append(f"UNTIL={until}T235959" if start_time else f"UNTIL={until}")
+    return ";".join(parts)
+
+
+def _date_value(day, start_time):
+    if start_time:
+        return datetime.combine(day, start_time).strftime("%Y%m%dT%H%M%S")
+    return day.strftime("%Y%m%d")
+
+
+def _safe_exdates(value):
+    try:
+        return normalize_exdates(value)
+    except ValueError:
+        return []
+
+
+def _dtstamp(created_at):
+    try:
+        stamp = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError):
+        stamp = datetime(2000, 1, 1)
+    return stamp.astimezone(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _escape(text):
+    return (str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+            .replace("\r\n", "\\n").replace("\n", "\\n"))
+
+
+def _lines(*lines):
+    return "".join(_fold(line) + "\r\n" for line in lines)
+
+
+def _fold(line):
+    """Split lines longer than 75 octets, continuing with a leading space."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+    chunks = []
+    while encoded:
+        size = 75 if not chunks else 74
+        # Never cut a UTF-8 sequence in half
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        chunks.append(encoded[:size].decode("utf-8"))
+        encoded = encoded[size:]
+    return "\r\n ".join(chunks)
@@ -0,0 +1,267 @@
+import threading
+from datetime import date, datetime, time, timedelta
+
+from reminder_index import compile_or_once, parse_date, parse_time
+
+MINUTES_PER_DAY = 1440
+# Timed reminders without an end time block this long (cut at midnight)
+DEFAULT_DURATION_MINUTES = 60
+# Reminder occurrences are indexed in blocks of days, built when first queried
+CHUNK_DAYS = 32
+MAX_CHUNKS = 64
+
+
+class IntervalTree:
+    """
+    A static centred interval tree over half-open (start, end, value) intervals.
+    Each node holds the intervals containing its centre, sorted by start and by
+    end, so finding the k intervals that overlap a range costs O(log n + k).
+    """
+
+    def __init__(self, intervals):
+        intervals = sorted((iv for iv in intervals if iv[1] > iv[0]), key=lambda iv: iv[0])
+        self.size = len(intervals)
+        self.root = _build(intervals)
+
+    def __len__(self):
+        return self.size
+
+    def overlapping(self, start, end):
+        """Yield the intervals with start < end and end > start of the query."""
+        stack = [self.root] if self.root else []
+        while stack:
+            center, by_start, by_end, left, right = stack.pop()
+            if end <= center:
+                for interval in by_start:
+                    if interval[0] >= end:
+                        break
+                    yield interval
+                if left:
+                    stack.append(left)
+            elif start > center:
+                for interval in by_end:
+                    if interval[1] <= start:
+                        break
+                    yield interval
+                if right:
+                    stack.append(right)
+            else:
+                yield from by_start
+                if left:
+                    stack.append(left)
+                if right:
+                    stack.append(right)
+
+
+def _build(intervals):
+    # intervals are sorted by start; the median start is the centre, so each
+    # side gets at most half of them and every node holds at least one
+    if not intervals:
+        return None
+    center = intervals[len(intervals) // 2][0]
+    left, here, right = [], [], []
+    for interval in intervals:
+        if interval[1] <= center:
+            left.append(interval)
+        elif interval[0] > center:
+            right.append(interval)
+        else:
+            here.append(interval)
+    by_end = sorted(here, key=lambda iv: iv[1], reverse=True)
+    return (center, here, by_end, _build(left), _build(right))
+
+
+def reminder_slot(reminder, day):
+    """The (start, end) minutes a timed reminder occupies on a day, or None for all-day ones."""
+    start_time = parse_time(reminder.get("start_time"))
+    if start_time is None:
+        return None
+    base = day.toordinal() * MINUTES_PER_DAY
+    start = base + start_time.hour * 60 + start_time.minute
+    end_time = parse_time(reminder.get("end_time"))
+    if end_time and end_time > start_time:
+        end = base + end_time.hour * 60 + end_time.minute
+    else:
+        end = min(start + DEFAULT_DURATION_MINUTES, base + MINUTES_PER_DAY)
+    return (start, end)
+
+
+def to_minute(moment):
+    return moment.toordinal() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def from_minute(minute):
+    day, minute = divmod(minute, MINUTES_PER_DAY)
+    return datetime.combine(date.fromordinal(day), time(minute // 60, minute % 60))
+
+
+class BusyIndex:
+    """
+    Interval trees over timed reminder occurrences and project task date ranges.
+
+    Occurrences are indexed per CHUNK_DAYS block, projected from the data
+    manager's reminder index the first time a block is queried. Reminders
+    reported by the change journal are patched into the cached blocks: their
+    old intervals are masked by id and their new ones kept beside the tree,
+    which is rebuilt once enough patches pile up. Task ranges are one tree,
+    rebuilt when any project changes.
+    """
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        self._lock = threading.Lock()
+        self._reminders_version = None
+        self._change_version = None
+        self._chunks = {}      # chunk number -> _Chunk
+        self._projects_version = None
+        self._tasks = IntervalTree([])
+
+    def slots(self, start, end):
+        """Timed reminder occurrences overlapping [start, end) minutes, as (start, end, reminder)."""
+        with self._lock:
+            self._sync_reminders()
+            found = []
+            first = start // MINUTES_PER_DAY // CHUNK_DAYS
+            last = (end - 1) // MINUTES_PER_DAY // CHUNK_DAYS
+            for chunk in range(first, last + 1):
+                found.extend(self._chunk(chunk).overlapping(start, end))
+        found.sort(key=lambda slot: (slot[0], slot[1]))
+        return found
+
+    def tasks(self, start_day, end_day):
+        """Open project tasks whose date range overlaps [start_day, end_day)."""
+        with self._lock:
+            self._sync_tasks()
+            found = [interval[2] for interval in self._tasks.overlapping(start_day.toordinal(), end_day.toordinal())]
+        found.sort(key=lambda task: (task["start_date"], task["end_date"]))
+        return found
+
+    def conflicts(self, reminder, horizon_days=366, limit=20):
+        """Other reminders overlapping this one's timed occurrences from today on."""
+        compiled = _compile(reminder)
+        if compiled is None:
+            return []
+        today = date.today()
+        found = []
+        with self._lock:
+            self._sync_reminders()
+            for day in compiled.between(today, today + timedelta(days=horizon_days)):
+                slot_start, slot_end = reminder_slot(reminder, day)
+                chunk = self._chunk(day.toordinal() // CHUNK_DAYS)
+                for other in sorted(chunk.overlapping(slot_start, slot_end), key=lambda slot: (slot[0], slot[1])):
+                    if other[2]["id"] != reminder["id"]:
+                        found.append(other)
+                        if len(found) >= limit:
+                            return found
+        return found
+
+    def _chunk(self, chunk):
+        cached = self._chunks.get(chunk)
+        if cached is None:
+            first, last = _chunk_days(chunk)
+            intervals = []
+            for reminder, day in self.data_manager.get_reminder_occurrences(first, last):
+                slot = reminder_slot(reminder, day)
+                if slot:
+                    intervals.append(slot + (reminder,))
+            cached = _Chunk(intervals)
+            if len(self._chunks) >= MAX_CHUNKS:
+                del self._chunks[next(iter(self._chunks))]
+            self._chunks[chunk] = cached
+        return cached
+
+    def _sync_reminders(self):
+        version = self.data_manager.data_version("reminders")
+        if version == self._reminders_version:
+            return
+        # Read the version first, so a change made mid-sync triggers another one
+        self._reminders_version = version
+        changes = self.data_manager.changes_since(self._change_version, ("reminders",))
+        self._change_version = changes["version"]
+        changed = len(changes["reminders"]["upserted"]) + len(changes["reminders"]["deleted"])
+        if changes["full"] or changed > _Chunk.MAX_PATCHES:
+            # Cheaper to re-project the blocks than to patch this many changes in
+            self._chunks.clear()
+            return
+        for reminder_id in changes["reminders"]["deleted"]:
+            for chunk in self._chunks.values():
+                chunk.discard(reminder_id)
+        for reminder in changes["reminders"]["upserted"]:
+            compiled = _compile(reminder)
+            for number, chunk in self._chunks.items():
+                chunk.discard(reminder["id"])
+                if compiled is not None:
+                    first, last = _chunk_days(number)
+                    chunk.add([reminder_slot(reminder, day) + (reminder,) for day in compiled.between(first, last)])
+
+    def _sync_tasks(self):
+        version = self.data_manager.data_version("projects")
+        if version == self._projects_version:
+            return
+        self._projects_version = version
+        intervals = []
+        for project in self.data_manager.get_all_projects():
+            stack = list(project.get("tasks", []))
+            while stack:
+                task = stack.pop()
+                stack.extend(task.get("subtasks", []))
+                start, end = parse_date(task.get("start_date")), parse_date(task.get("end_date"))
+                if start and end and task.get("status") != "Completed":
+                    intervals.append((start.toordinal(), end.toordinal() + 1, {
+                        "project_id": project["id"],
+                        "project": project.get("name"),
+                        "id": task["id"],
+                        "name": task.get("name"),
+                        "start_date": task.get("start_date"),
+                        "end_date": task.get("end_date"),
+                        "status": task.get("status"),
+                    }))
+        self._tasks = IntervalTree(intervals)
+
+
+class _Chunk:
+    """One block's interval tree, plus the changes made since it was built."""
+
+    # Patches kept beside the tree before it is rebuilt with them
+    MAX_PATCHES = 32
+
+    def __init__(self, intervals):
+        self._build(intervals)
+
+    def _build(self, intervals):
+        self.intervals = intervals
+        self.tree = IntervalTree(intervals)
+        self.ids = {interval[2]["id"] for interval in intervals}
+        self.masked = set()  # ids whose intervals in the tree are out of date
+        self.added = []      # intervals not in the tree yet
+
+    def overlapping(self, start, end):
+        for interval in self.tree.overlapping(start, end):
+            if interval[2]["id"] not in self.masked:
+                yield interval
+        for interval in self.added:
+            if interval[0] < end and interval[1] > start:
+                yield interval
+
+    def discard(self, reminder_id):
+        if reminder_id in self.ids:
+            self.masked.add(reminder_id)
+        if self.added:
+            self.added = [interval for interval in self.added if interval[2]["id"] != reminder_id]
+
+    def add(self, intervals):
+        self.added.extend(intervals)
+        if len(self.masked) + len(self.added) > self.MAX_PATCHES:
+            self._build([interval for interval in self.intervals if interval[2]["id"] not in self.masked]
+                        + self.added)
+
+
+def _chunk_days(chunk):
+    return date.fromordinal(chunk * CHUNK_DAYS), date.fromordinal(chunk * CHUNK_DAYS + CHUNK_DAYS - 1)
+
+
+def _compile(reminder):
+    """The reminder's compiled recurrence, or None if it has no time slots."""
+    if parse_time(reminder.get("start_time")) is None:
+        return None
+    return compile_or_once(reminder)
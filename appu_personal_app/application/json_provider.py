@@ -0,0 +1,74 @@
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson else "json"
+
+
+def dumpb(obj, pretty=False, default=None):
+    """
+    Serialise to UTF-8 bytes: compact unless pretty, with orjson when it is
+    installed. Anything orjson refuses (integers over 64 bits, say) falls back
+    to the standard library, so both backends accept the same data.
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except TypeError: # orjson.JSONEncodeError
+            pass
+    if pretty:
+        text = json.dumps(obj, default=default, ensure_ascii=False, indent=2)
+    else:
+        text = json.dumps(obj, default=default, ensure_ascii=False, separators=(",", ":"))
+    return text.encode("utf-8")
+
+
+def dumps(obj, pretty=False, default=None):
+    return dumpb(obj, pretty, default).decode("utf-8")
+
+
+def loads(data):
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load_file(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Flask's JSON provider on top of dumpb/loads. Output is compact and keeps
+    key order; in debug mode (or with compact = False) responses are indented.
+    Dates, UUIDs and dataclasses go through Flask's default hook as before.
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs) # Callers asking for stdlib options get stdlib
+        return dumps(obj, default=self.default)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            dumpb(obj, pretty=pretty, default=self.default) + b"\n", mimetype=self.mimetype
+        )
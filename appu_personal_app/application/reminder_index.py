@@ -0,0 +1,611 @@
+import bisect
+import calendar
+import heapq
+import re
+from datetime import date, datetime, timedelta
+
+RECURRING = ("Daily", "Weekly", "Monthly", "Yearly")
+
+# RRULE-style recurrences (a subset of RFC 5545), e.g. "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE"
+RULE_FREQS = ("DAILY", "WEEKLY", "MONTHLY", "YEARLY")
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+MAX_COUNT = 10000
+_BYDAY_RE = re.compile(r"^([+-]?\d{1,2})?(MO|TU|WE|TH|FR|SA|SU)$")
+
+
+# --- Date arithmetic ---
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_time(value):
+    try:
+        return datetime.strptime(value, "%H:%M").time()
+    except (TypeError, ValueError):
+        return None
+
+
+def next_occurrence(start_date, recurrence, relative_to):
+    """
+    The first occurrence on or after relative_to, or None for a past one-time
+    reminder. Jumps straight there, so the cost does not grow with the reminder's age.
+    """
+    if recurrence not in RECURRING:
+        return start_date if start_date >= relative_to else None
+    if start_date >= relative_to:
+        return start_date
+
+    if recurrence == "Daily":
+        return relative_to
+    if recurrence == "Weekly":
+        weeks = -(-(relative_to - start_date).days // 7)
+        return start_date + timedelta(weeks=weeks)
+    if recurrence == "Monthly":
+        steps = (relative_to.year - start_date.year) * 12 + relative_to.month - start_date.month
+        occurrence = _monthly_occurrence(start_date, steps)
+        if occurrence < relative_to:
+            occurrence = _monthly_occurrence(start_date, steps + 1)
+        return occurrence
+
+    steps = relative_to.year - start_date.year
+    occurrence = _yearly_occurrence(start_date, steps)
+    if occurrence < relative_to:
+        occurrence = _yearly_occurrence(start_date, steps + 1)
+    return occurrence
+
+
+def occurrences_between(base_date, recurrence, start_date, end_date):
+    """Yield every occurrence of a reminder from start_date to end_date inclusive."""
+    if recurrence not in RECURRING:
+        if start_date <= base_date <= end_date:
+            yield base_date
+        return
+
+    current = base_date
+    # Catch up to or start from the earliest needed date
+    if current < start_date:
+        current = next_occurrence(base_date, recurrence, start_date)
+
+    while current <= end_date:
+        yield current
+        if recurrence == "Daily":
+            current += timedelta(days=1)
+        elif recurrence == "Weekly":
+            current += timedelta(weeks=1)
+        elif recurrence == "Monthly":
+            year, month = divmod(current.month, 12)
+            year += current.year
+            # Always try to use the original day
+            day = min(base_date.day, calendar.monthrange(year, month + 1)[1])
+            current = current.replace(year=year, month=month + 1, day=day)
+        else:
+            try:
+                current = current.replace(year=current.year + 1)
+            except ValueError:
+                current = current.replace(year=current.year + 1, day=28)
+
+
+def _monthly_occurrence(start_date, steps):
+    """
+    The date 'steps' months after start_date. Each month clamps the day to that
+    month's length and the clamped day carries on, so the 31st becomes the 30th
+    after the first 30-day month and stays there.
+    """
+    day = start_date.day
+    if day > 28:
+        if steps >= 48:
+            day = 28 # Four years always include a 28-day February
+        else:
+            for i in range(1, steps + 1):
+                year, month = divmod(start_date.month - 1 + i, 12)
+                day = min(day, calendar.monthrange(start_date.year + year, month + 1)[1])
+    year, month = divmod(start_date.month - 1 + steps, 12)
+    return start_date.replace(year=start_date.year + year, month=month + 1, day=day)
+
+
+def _yearly_occurrence(start_date, steps):
+    """The date 'steps' years after start_date; Feb 29 moves to Feb 28 for good."""
+    if steps and start_date.month == 2 and start_date.day == 29:
+        return start_date.replace(year=start_date.year + steps, day=28)
+    return start_date.replace(year=start_date.year + steps)
+
+
+# --- Recurrence rules ---
+def is_rule(recurrence):
+    return isinstance(recurrence, str) and recurrence.upper().lstrip().startswith(("FREQ=", "RRULE:"))
+
+
+def parse_rule(text):
+    """
+    Parse an RRULE string into a dict. Raises ValueError for anything outside
+    the supported subset: FREQ, INTERVAL, BYDAY (with ordinals for MONTHLY, or
+    YEARLY with BYMONTH), BYMONTHDAY, BYMONTH, COUNT or UNTIL, WKST=MO.
+    """
+    text = text.strip()
+    if text.upper().startswith("RRULE:"):
+        text = text[6:]
+    parts = {}
+    for part in filter(None, text.split(";")):
+        key, sep, value = part.partition("=")
+        key = key.strip().upper()
+        if not sep or not value.strip():
+            raise ValueError(f"Malformed rule part '{part}'")
+        if key in parts:
+            raise ValueError(f"{key} is given twice")
+        parts[key] = value.strip().upper()
+
+    rule = {"freq": parts.pop("FREQ", None), "interval": 1, "byday": [], "bymonthday": [], "bymonth": [],
+            "count": None, "until": None}
+    if rule["freq"] not in RULE_FREQS:
+        raise ValueError("FREQ must be one of " + ", ".join(RULE_FREQS))
+    if "INTERVAL" in parts:
+        rule["interval"] = _rule_int(parts.pop("INTERVAL"), "INTERVAL", 1, 1000)
+    if "COUNT" in parts:
+        rule["count"] = _rule_int(parts.pop("COUNT"), "COUNT", 1, MAX_COUNT)
+    if "UNTIL" in parts:
+        rule["until"] = _rule_date(parts.pop("UNTIL"))
+        if rule["count"] is not None:
+            raise ValueError("COUNT and UNTIL cannot be combined")
+    for value in filter(None, parts.pop("BYDAY", "").split(",")):
+        match = _BYDAY_RE.match(value.strip())
+        if not match:
+            raise ValueError(f"Invalid BYDAY value '{value}'")
+        nth = int(match.group(1)) if match.group(1) else 0
+        if nth and not 1 <= abs(nth) <= 5:
+            raise ValueError(f"Invalid BYDAY value '{value}'")
+        rule["byday"].append((nth, WEEKDAYS.index(match.group(2))))
+    for value in filter(None, parts.pop("BYMONTHDAY", "").split(",")):
+        day = _rule_int(value, "BYMONTHDAY", -31, 31)
+        if day == 0:
+            raise ValueError("BYMONTHDAY cannot be 0")
+        rule["bymonthday"].append(day)
+    for value in filter(None, parts.pop("BYMONTH", "").split(",")):
+        rule["bymonth"].append(_rule_int(value, "BYMONTH", 1, 12))
+    if parts.pop("WKST", "MO") != "MO":
+        raise ValueError("Only WKST=MO is supported")
+    if parts:
+        raise ValueError("Unsupported rule part " + ", ".join(sorted(parts)))
+
+    nth_days = any(nth for nth, _ in rule["byday"])
+    if rule["freq"] in ("DAILY", "WEEKLY") and (nth_days or rule["bymonthday"]):
+        raise ValueError(f"{rule['freq']} rules take plain BYDAY weekdays only")
+    if rule["freq"] == "YEARLY" and rule["byday"] and not rule["bymonth"]:
+        raise ValueError("BYDAY in a YEARLY rule needs BYMONTH")
+    return rule
+
+
+def _rule_int(value, name, low, high):
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not low <= number <= high:
+        raise ValueError(f"{name} must be between {low} and {high}")
+    return number
+
+
+def _rule_date(value):
+    for fmt, length in (("%Y%m%d", 8), ("%Y-%m-%d", 10)):
+        try:
+            return datetime.strptime(value[:length], fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid UNTIL date '{value}'")
+
+
+def validate_recurrence(recurrence):
+    """Raise ValueError unless recurrence is a known name or a supported rule."""
+    if recurrence in ("None",) + RECURRING:
+        return
+    if not is_rule(recurrence):
+        raise ValueError(f"Unknown recurrence '{recurrence}'")
+    parse_rule(recurrence)
+
+
+def normalize_exdates(value):
+    """Exception dates as a sorted list of YYYY-MM-DD strings (list or comma-separated)."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    dates = set()
+    for item in value:
+        item = str(item).strip()
+        if not item:
+            continue
+        if parse_date(item) is None:
+            raise ValueError(f"Invalid exception date '{item}', expected YYYY-MM-DD")
+        dates.add(item)
+    return sorted(dates)
+
+
+def recurrence_kind(recurrence):
+    """'none', 'daily', 'weekly', 'monthly' or 'yearly', e.g. for CSS classes."""
+    if is_rule(recurrence):
+        try:
+            return parse_rule(recurrence)["freq"].lower()
+        except ValueError:
+            return "none"
+    return recurrence.lower() if recurrence in RECURRING else "none"
+
+
+def describe_recurrence(recurrence):
+    """A short human-readable label, e.g. 'Every 2 weeks on Mon, Wed'."""
+    if not is_rule(recurrence):
+        return recurrence or "None"
+    try:
+        rule = parse_rule(recurrence)
+    except ValueError:
+        return recurrence
+    unit = {"DAILY": "day", "WEEKLY": "week", "MONTHLY": "month", "YEARLY": "year"}[rule["freq"]]
+    label = f"Every {rule['interval']} {unit}s" if rule["interval"] > 1 else f"Every {unit}"
+    if rule["bymonth"]:
+        label += " in " + ", ".join(calendar.month_abbr[m] for m in rule["bymonth"])
+    days = []
+    for nth, weekday in rule["byday"]:
+        name = calendar.day_abbr[weekday]
+        if nth == -1:
+            name = "last " + name
+        elif nth:
+            name = f"{_ordinal(nth)} {name}" if nth > 0 else f"{_ordinal(-nth)} last {name}"
+        days.append(name)
+    days.extend("last day" if d == -1 else _ordinal(d) if d > 0 else f"{_ordinal(-d)} last day" for d in rule["bymonthday"])
+    if days:
+        label += " on " + ", ".join(days)
+    if rule["count"]:
+        label += f", {rule['count']} times"
+    if rule["until"]:
+        label += f", until {rule['until'].isoformat()}"
+    return label
+
+
+def _ordinal(n):
+    suffix = "th" if 10 <= n % 100 <= 20 else {1: "st", 2: "nd", 3: "rd"}.get(n % 10, "th")
+    return f"{n}{suffix}"
+
+
+def compile_recurrence(start_date, recurrence, exdates=()):
+    """Compile a reminder's recurrence once into an object answering date queries."""
+    excluded = frozenset(d.toordinal() for d in filter(None, map(parse_date, exdates or ())))
+    if is_rule(recurrence):
+        return RuleRecurrence(start_date, parse_rule(recurrence), excluded)
+    if recurrence in RECURRING:
+        return SimpleRecurrence(start_date, recurrence, excluded)
+    return OneTime(start_date)
+
+
+def compile_or_once(reminder):
+    """
+    A stored reminder's compiled recurrence, or None if its date is unreadable.
+    A broken rule still shows its first date, so it falls back to OneTime.
+    """
+    start = parse_date(reminder.get("date"))
+    if start is None:
+        return None
+    try:
+        return compile_recurrence(start, reminder.get("recurrence"), reminder.get("exdates"))
+    except ValueError:
+        return OneTime(start)
+
+
+class OneTime:
+    last = None
+
+    def __init__(self, start_date):
+        self.start = start_date
+
+    def next_on_or_after(self, day):
+        return self.start if self.start >= day else None
+
+    def between(self, start_date, end_date):
+        if start_date <= self.start <= end_date:
+            yield self.start
+
+
+class SimpleRecurrence:
+    """Daily/Weekly/Monthly/Yearly with the app's original clamping rules."""
+    last = None
+
+    def __init__(self, start_date, recurrence, excluded=frozenset()):
+        self.start = start_date
+        self.recurrence = recurrence
+        self.excluded = excluded
+
+    def next_on_or_after(self, day):
+        occurrence = next_occurrence(self.start, self.recurrence, day)
+        while occurrence.toordinal() in self.excluded:
+            occurrence = next_occurrence(self.start, self.recurrence, occurrence + timedelta(days=1))
+        return occurrence
+
+    def between(self, start_date, end_date):
+        for occurrence in occurrences_between(self.start, self.recurrence, start_date, end_date):
+            if occurrence.toordinal() not in self.excluded:
+                yield occurrence
+
+
+class RuleRecurrence:
+    """
+    A compiled RRULE. Occurrences are found period by period (one day, week,
+    month or year per step, INTERVAL periods apart), jumping straight to the
+    period that holds a date instead of walking from the start. The reminder's
+    own date is always the first occurrence. COUNT is turned into a last date
+    once, here; exception dates still count towards COUNT, as in RFC 5545.
+    """
+
+    def __init__(self, start_date, rule, excluded=frozenset()):
+        self.start = start_date
+        self.rule = rule
+        self.excluded = excluded
+        self.freq = rule["freq"]
+        self.interval = rule["interval"]
+        self.bymonth = set(rule["bymonth"])
+        self.weekdays = sorted({weekday for nth, weekday in rule["byday"]})
+        self.byday = rule["byday"]
+        self.bymonthday = rule["bymonthday"]
+        # Monday of the start's week anchors WEEKLY periods
+        self._anchor = start_date - timedelta(days=start_date.weekday())
+        # A rule that cannot match gives up after 400 years, when the calendar repeats
+        self._max_periods = {"DAILY": 146097, "WEEKLY": 20871, "MONTHLY": 4800, "YEARLY": 400}[self.freq] // self.interval + 1
+        self.last = rule["until"]
+        if rule["count"]:
+            occurrence = start_date
+            for _ in range(rule["count"] - 1):
+                following = self._first_from(occurrence + timedelta(days=1))
+                if following is None:
+                    break
+                occurrence = following
+            self.last = occurrence
+
+    def next_on_or_after(self, day):
+        occurrence = self._first_from(day)
+        while occurrence is not None and occurrence.toordinal() in self.excluded:
+            occurrence = self._first_from(occurrence + timedelta(days=1))
+        if occurrence is None or (self.last is not None and occurrence > self.last):
+            return None
+        return occurrence
+
+    def between(self, start_date, end_date):
+        if self.last is not None:
+            end_date = min(end_date, self.last)
+        occurrence = self._first_from(start_date)
+        while occurrence is not None and occurrence <= end_date:
+            if occurrence.toordinal() not in self.excluded:
+                yield occurrence
+            occurrence = self._first_from(occurrence + timedelta(days=1))
+
+    def _first_from(self, day):
+        """First occurrence on or after day, ignoring COUNT/UNTIL and exception dates."""
+        if day <= self.start:
+            return self.start
+        period = self._period_of(day)
+        period += -period % self.interval
+        for _ in range(self._max_periods):
+            for candidate in self._candidates(period):
+                if candidate >= day:
+                    return candidate
+            period += self.interval
+        return None
+
+    def _period_of(self, day):
+        if self.freq == "DAILY":
+            return (day - self.start).days
+        if self.freq == "WEEKLY":
+            return (day - self._anchor).days // 7
+        if self.freq == "MONTHLY":
+            return (day.year - self.start.year) * 12 + day.month - self.start.month
+        return day.year - self.start.year
+
+    def _candidates(self, period):
+        """The rule's dates inside one period, in order."""
+        if self.freq == "DAILY":
+            day = self.start + timedelta(days=period)
+            if self.weekdays and day.weekday() not in self.weekdays:
+                return []
+            if self.bymonth and day.month not in self.bymonth:
+                return []
+            return [day]
+        if self.freq == "WEEKLY":
+            week = self._anchor + timedelta(weeks=period)
+            weekdays = self.weekdays or [self.start.weekday()]
+            days = [week + timedelta(days=weekday) for weekday in weekdays]
+            return [day for day in days if not self.bymonth or day.month in self.bymonth]
+        if self.freq == "MONTHLY":
+            year, month = divmod(self.start.month - 1 + period, 12)
+            year += self.start.year
+            if self.bymonth and month + 1 not in self.bymonth:
+                return []
+            return self._days_in_month(year, month + 1)
+        year = self.start.year + period
+        days = []
+        for month in sorted(self.bymonth) or [self.start.month]:
+            days.extend(self._days_in_month(year, month))
+        return days
+
+    def _days_in_month(self, year, month):
+        if not 1 <= year <= 9999:
+            return []
+        first_weekday, length = calendar.monthrange(year, month)
+        if self.bymonthday:
+            days = {d if d > 0 else length + d + 1 for d in self.bymonthday}
+            days = {d for d in days if 1 <= d <= length}
+        elif not self.byday:
+            days = {self.start.day} if self.start.day <= length else set()
+        else:
+            days = set(range(1, length + 1))
+        if self.byday:
+            matching = set()
+            for nth, weekday in self.byday:
+                first = (weekday - first_weekday) % 7 + 1
+                same_weekday = list(range(first, length + 1, 7))
+                if not nth:
+                    matching.update(same_weekday)
+                elif nth <= len(same_weekday) and -nth <= len(same_weekday):
+                    matching.add(same_weekday[nth - 1 if nth > 0 else nth])
+            days &= matching
+        return [date(year, month, d) for d in sorted(days)]
+
+
+# --- Occurrence index ---
+class ReminderIndex:
+    """
+    Reminders keyed for date-window queries, kept in step with every change.
+
+    Each reminder's recurrence is compiled once. Start dates are stored as
+    ordinals in sorted buckets: one-time reminders by date, simple recurrences
+    by name (yearly ones also by month) and rules by start, so a window query
+    only looks at reminders that can fall inside it. For "what's coming up",
+    recurring reminders also sit in a min-heap keyed by their next occurrence
+    on or after the index's current day; at a day boundary only the entries
+    that fell behind are moved forward.
+    """
+
+    def __init__(self, reminders=()):
+        self.rebuild(reminders)
+
+    def rebuild(self, reminders):
+        # id -> (reminder, seq, start ordinal, compiled recurrence, bucket key, heap token, signature)
+        self._entries = {}
+        self._buckets = {}
+        self._heap = []
+        self._today = None
+        self._seq = 0
+        self._token = 0
+        for reminder in reminders:
+            self.put(reminder)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def put(self, reminder):
+        """Add a reminder, or re-index one whose date, recurrence or exception dates changed."""
+        old = self._entries.get(reminder["id"])
+        signature = (reminder.get("date"), reminder.get("recurrence"), tuple(reminder.get("exdates") or ()))
+        if old is not None:
+            if old[6] == signature:
+                # Same place in the index; just point at the current object
+                self._entries[reminder["id"]] = (reminder,) + old[1:]
+                return
+            self._unlink(reminder["id"], old)
+            seq = old[1]
+        else:
+            self._seq += 1
+            seq = self._seq
+        compiled = compile_or_once(reminder)
+        if compiled is None:
+            return # Unparseable dates never show up, as before
+
+        ordinal = compiled.start.toordinal()
+        if isinstance(compiled, SimpleRecurrence):
+            key = ("Yearly", compiled.start.month) if compiled.recurrence == "Yearly" else compiled.recurrence
+        else:
+            key = "None" if isinstance(compiled, OneTime) else "Rule"
+        bisect.insort(self._buckets.setdefault(key, []), (ordinal, seq, reminder["id"]))
+        self._token += 1
+        self._entries[reminder["id"]] = (reminder, seq, ordinal, compiled, key, self._token, signature)
+        if key != "None" and self._today is not None:
+            self._push(reminder["id"], self._today)
+
+    def discard(self, reminder_id):
+        entry = self._entries.get(reminder_id)
+        if entry is not None:
+            self._unlink(reminder_id, entry)
+
+    def _unlink(self, reminder_id, entry):
+        # Heap entries are dropped lazily: their token no longer matches
+        del self._entries[reminder_id]
+        bucket = self._buckets[entry[4]]
+        i = bisect.bisect_left(bucket, (entry[2], entry[1], reminder_id))
+        if i < len(bucket) and bucket[i][2] == reminder_id:
+            del bucket[i]
+
+    def _push(self, reminder_id, today):
+        entry = self._entries[reminder_id]
+        nxt = entry[3].next_on_or_after(date.fromordinal(today))
+        if nxt is not None: # A finished rule has nothing left to schedule
+            heapq.heappush(self._heap, (nxt.toordinal(), entry[1], reminder_id, entry[5]))
+
+    def _is_live(self, heap_entry):
+        entry = self._entries.get(heap_entry[2])
+        return entry is not None and entry[5] == heap_entry[3]
+
+    def _roll_to(self, today):
+        """Move the heap forward so every next occurrence is on or after today."""
+        if self._today is not None and today == self._today:
+            return
+        if self._today is None or today < self._today:
+            # First use, or the clock went backwards: rebuild the heap
+            self._heap = []
+            self._today = today
+            for reminder_id, entry in self._entries.items():
+                if entry[4] != "None":
+                    self._push(reminder_id, today)
+            return
+        self._today = today
+        while self._heap and self._heap[0][0] < today:
+            stale = heapq.heappop(self._heap)
+            if self._is_live(stale):
+                self._push(stale[2], today)
+
+    def upcoming(self, start_date, end_date):
+        """
+        (reminder, date) for the next occurrence of each reminder between
+        start_date (normally today) and end_date, ordered by date.
+        """
+        first, last = start_date.toordinal(), end_date.toordinal()
+        found = [(ordinal, seq, rid) for ordinal, seq, rid in self._range("None", first, last)]
+
+        self._roll_to(first)
+        # Walk the heap top-down; a node past end_date hides its whole subtree
+        heap = self._heap
+        stack = [0] if heap else []
+        while stack:
+            i = stack.pop()
+            if heap[i][0] > last:
+                continue
+            if self._is_live(heap[i]):
+                found.append(heap[i][:3])
+            stack.extend(j for j in (2 * i + 1, 2 * i + 2) if j < len(heap))
+
+        found.sort()
+        return [(self._entries[rid][0], date.fromordinal(ordinal)) for ordinal, _, rid in found]
+
+    def between(self, start_date, end_date):
+        """(reminder, date) for every occurrence between start_date and end_date."""
+        first, last = start_date.toordinal(), end_date.toordinal()
+        candidates = list(self._range("None", first, last))
+        for key in ("Daily", "Weekly", "Monthly", "Rule"):
+            candidates.extend(self._range(key, None, last))
+        for month in _months_between(start_date, end_date):
+            candidates.extend(self._range(("Yearly", month), None, last))
+
+        # Same order as walking the reminder list: by reminder, then by date
+        candidates.sort(key=lambda c: c[1])
+        projected = []
+        for _, _, rid in candidates:
+            reminder, compiled = self._entries[rid][0], self._entries[rid][3]
+            if compiled.last is not None and compiled.last < start_date:
+                continue
+            for day in compiled.between(start_date, end_date):
+                projected.append((reminder, day))
+        return projected
+
+    def _range(self, key, first, last):
+        """Bucket entries whose start ordinal is in [first, last] (first=None: unbounded)."""
+        bucket = self._buckets.get(key)
+        if not bucket:
+            return []
+        lo = 0 if first is None else bisect.bisect_left(bucket, (first,))
+        hi = bisect.bisect_left(bucket, (last + 1,))
+        return bucket[lo:hi]
+
+
+def _months_between(start_date, end_date):
+    if end_date < start_date:
+        return []
+    span = (end_date.year - start_date.year) * 12 + end_date.month - start_date.month
+    if span >= 11:
+        return range(1, 13)
+    return [(start_date.month - 1 + i) % 12 + 1 for i in range(span + 1)]
@@ -0,0 +1,162 @@
+import heapq
+import queue
+import threading
+from datetime import datetime, time, timedelta
+
+from reminder_index import compile_or_once, parse_time
+
+# Reminders saved by other worker processes are only seen by re-reading the
+# store, so the thread wakes at least this often to look
+RESYNC_SECONDS = 30
+
+
+class ReminderScheduler:
+    """
+    Pushes reminders to subscribers at the moment they are due.
+
+    Fire times (the next occurrence at the reminder's start time, or midnight
+    for all-day reminders) sit in a min-heap. The thread sleeps until the
+    earliest one, until notify() reports that the reminders changed, or for
+    RESYNC_SECONDS to pick up other processes' writes. The data manager's change
+    journal says which reminders changed; of those, only the ones whose date,
+    time, recurrence or exception dates differ get new heap entries. Stale
+    entries are skipped lazily by token.
+
+    The heap belongs to the thread. The condition only guards the wake-up flag
+    and the subscribers, so reading the store never holds up notify(),
+    subscribe() or unsubscribe().
+    """
+
+    def __init__(self, data_manager, now=datetime.now):
+        self.data_manager = data_manager
+        self._now = now
+        self._heap = []      # (fire time, token, reminder id)
+        self._entries = {}   # reminder id -> (signature, token, reminder, compiled recurrence, time of day)
+        self._token = 0
+        self._version = None
+        self._change_version = None
+        self._condition = threading.Condition()
+        self._dirty = False
+        self._subscribers = set()
+        self._thread = None
+
+    def start(self):
+        with self._condition:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="reminder-scheduler", daemon=True)
+                self._thread.start()
+
+    def notify(self):
+        """Wake the thread if the reminders changed since it last looked."""
+        if self._thread is not None and self.data_manager.data_version("reminders") != self._version:
+            with self._condition:
+                self._dirty = True
+                self._condition.notify()
+
+    def subscribe(self, maxsize=100):
+        subscriber = queue.Queue(maxsize)
+        with self._condition:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._condition:
+            self._subscribers.discard(subscriber)
+
+    def _run(self):
+        while True:
+            now = self._now()
+            self.sync(now)
+            self.fire_due(now)
+            timeout = RESYNC_SECONDS
+            if self._heap:
+                timeout = min(timeout, (self._heap[0][0] - now).total_seconds())
+            with self._condition:
+                # A notify() that came in during the pass means look again now
+                if not self._dirty:
+                    self._condition.wait(timeout)
+                self._dirty = False
+
+    def sync(self, now):
+        """Reschedule the reminders that were added, changed or removed."""
+        self.data_manager.refresh()
+        version = self.data_manager.data_version("reminders")
+        if version == self._version:
+            return
+        # Read the version first, so a change made mid-pass triggers another one
+        self._version = version
+        changes = self.data_manager.changes_since(self._change_version, ("reminders",))
+        self._change_version = changes["version"]
+        for reminder in changes["reminders"]["upserted"]:
+            self._update(reminder, now)
+        if changes["full"]:
+            # A snapshot lists every reminder; anything else is gone
+            seen = {reminder["id"] for reminder in changes["reminders"]["upserted"]}
+            for reminder_id in self._entries.keys() - seen:
+                del self._entries[reminder_id]
+        else:
+            for reminder_id in changes["reminders"]["deleted"]:
+                self._entries.pop(reminder_id, None)
+        # Only stale entries can be left at the top; drop them so the wait is exact
+        while self._heap and self._is_stale(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def _update(self, reminder, now):
+        signature = (reminder.get("date"), reminder.get("start_time"), reminder.get("recurrence"),
+                     tuple(reminder.get("exdates") or ()))
+        old = self._entries.get(reminder["id"])
+        if old is not None and old[0] == signature:
+            self._entries[reminder["id"]] = (signature,) + old[1:2] + (reminder,) + old[3:]
+            return
+        self._schedule(reminder, signature, now)
+
+    def _schedule(self, reminder, signature, now):
+        compiled = compile_or_once(reminder)
+        if compiled is None:
+            self._entries.pop(reminder["id"], None)
+            return
+        at = parse_time(reminder.get("start_time")) or time.min
+        self._token += 1
+        self._entries[reminder["id"]] = (signature, self._token, reminder, compiled, at)
+        # Occurrences whose time already passed today are not announced late
+        day = compiled.next_on_or_after(now.date())
+        if day == now.date() and datetime.combine(day, at) < now:
+            day = compiled.next_on_or_after(day + timedelta(days=1))
+        self._push(reminder["id"], day, at)
+
+    def _push(self, reminder_id, day, at):
+        if day is not None:
+            heapq.heappush(self._heap, (datetime.combine(day, at), self._entries[reminder_id][1], reminder_id))
+
+    def _is_stale(self, item):
+        entry = self._entries.get(item[2])
+        return entry is None or entry[1] != item[1]
+
+    def fire_due(self, now):
+        """Send every reminder due by now and queue its next occurrence."""
+        while self._heap and self._heap[0][0] <= now:
+            item = heapq.heappop(self._heap)
+            if self._is_stale(item):
+                continue
+            fire_at, token, reminder_id = item
+            signature, token, reminder, compiled, at = self._entries[reminder_id]
+            self._publish({
+                "id": reminder_id,
+                "title": reminder.get("title"),
+                "description": reminder.get("description"),
+                "date": fire_at.date().isoformat(),
+                "start_time": reminder.get("start_time"),
+                "end_time": reminder.get("end_time"),
+            })
+            self._push(reminder_id, compiled.next_on_or_after(fire_at.date() + timedelta(days=1)), at)
+        while self._heap and self._is_stale(self._heap[0]):
+            heapq.heappop(self._heap)
+
+    def _publish(self, alert):
+        with self._condition:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(alert)
+            except queue.Full:
+                pass # A stalled client misses alerts rather than holding up the rest
@@ -0,0 +1,419 @@
+import json
+import os
+import sqlite3
+import sys
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import json_provider
+from data_manager import BaseDataManager, DataManager, DATA_DIR, DATA_FILE, KB_FILE, _with_display_date, kb_search_score
+from reminder_index import ReminderIndex
+
+SQLITE_FILE = os.path.join(DATA_DIR, "axolotl.db")
+
+# Each collection is a table holding the item as a JSON document plus the
+# columns we filter on, so lookups hit an index instead of scanning a list.
+TABLE_COLUMNS = {
+    "reminders": ("date", "recurrence"),
+    "tasks": ("status",),
+    "kb": ("title", "data"),
+    "projects": ("status", "start_date", "end_date"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reminders (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    date TEXT,
+    recurrence TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_date ON reminders (recurrence, date);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    status TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks (status);
+
+CREATE TABLE IF NOT EXISTS kb (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT,
+    data TEXT,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS projects (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    status TEXT,
+    start_date TEXT,
+    end_date TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_projects_status ON projects (status);
+CREATE INDEX IF NOT EXISTS idx_projects_dates ON projects (start_date, end_date);
+"""
+
+
+class SQLiteDataManager(BaseDataManager):
+    """
+    Data manager backed by a single SQLite database.
+    Reminders, tasks, projects and the knowledge base live in indexed tables;
+    settings, user name and the secure vault keep using their JSON files.
+    """
+
+    def __init__(self, db_file=SQLITE_FILE):
+        super().__init__(db_file + ".lock")
+        self.db_file = db_file
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    @contextmanager
+    def batch(self):
+        """
+        Run the block as one transaction: committed at the end, rolled back
+        if it raises, so a failed bulk import leaves nothing behind.
+        """
+        with self._locked():
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                if self._batch_depth == 1:
+                    with self._lock:
+                        self.conn.rollback()
+                        self._task_index.clear()
+                        self._reset_changes() # Changes recorded for rolled back rows
+                raise
+            finally:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.flush()
+
+    def flush(self):
+        # Rows written inside batch() share one transaction
+        with self._lock:
+            self.conn.commit()
+        super().flush()
+
+    def backup(self, backup_dir, timestamp):
+        """
+        Snapshot the database into backup_dir with SQLite's online backup API,
+        which copies a consistent state even while other connections write.
+        """
+        name = os.path.splitext(os.path.basename(self.db_file))[0]
+        dst = os.path.join(backup_dir, f"{name}_{timestamp}.db")
+        target = sqlite3.connect(dst)
+        try:
+            with self._lock:
+                self.conn.backup(target)
+        finally:
+            target.close()
+        return [os.path.basename(dst)]
+
+    # --- Row helpers ---
+    def _upsert(self, table, item, commit=True):
+        columns = TABLE_COLUMNS[table]
+        sql = "INSERT INTO {table} (id, {cols}, doc) VALUES (?, {marks}, ?) ON CONFLICT(id) DO UPDATE SET {updates}, doc = excluded.doc".format(
+            table=table,
+            cols=", ".join(columns),
+            marks=", ".join("?" for _ in columns),
+            updates=", ".join(f"{col} = excluded.{col}" for col in columns),
+        )
+        params = [item["id"]] + [item.get(col) for col in columns] + [json_provider.dumps(item)]
+        with self._lock:
+            self.conn.execute(sql, params)
+            if commit and not self._batch_depth:
+                self.conn.commit()
+            self._record_change(table, item["id"])
+
+    def _delete(self, table, item_id):
+        with self._lock:
+            self.conn.execute(f"DELETE FROM {table} WHERE id = ?", (item_id,))
+            if not self._batch_depth:
+                self.conn.commit()
+            self._record_change(table, item_id, deleted=True)
+
+    def _fetch_one(self, table, item_id):
+        with self._lock:
+            row = self.conn.execute(f"SELECT doc FROM {table} WHERE id = ?", (item_id,)).fetchone()
+        return json_provider.loads(row[0]) if row else None
+
+    def _fetch_all(self, table, where="", params=()):
+        with self._lock:
+            rows = self.conn.execute(f"SELECT doc FROM {table} {where} ORDER BY seq", params).fetchall()
+        return [json_provider.loads(row[0]) for row in rows]
+
+    def data_version(self, collection):
+        if collection not in TABLE_COLUMNS:
+            return super().data_version(collection)
+        # Our own writes, plus PRAGMA data_version for commits by other connections
+        with self._lock:
+            external = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            return (self.conn.total_changes, external)
+
+    def _check_external_changes(self):
+        # PRAGMA data_version moves only for commits made by other connections
+        with self._lock:
+            external = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._change_versions.setdefault("external", external) != external:
+                self._change_versions["external"] = external
+                self._reset_changes()
+
+    def _current_item(self, collection, item_id):
+        return self._fetch_one(collection, item_id)
+
+    # --- Reminders ---
+    def add_reminder(self, title, description, date_str, recurrence, start_time=None, end_time=None, exdates=None):
+        reminder = self._new_reminder(title, description, date_str, recurrence, start_time, end_time, exdates)
+        self._upsert("reminders", reminder)
+        return reminder
+
+    def _reminders_overlapping(self, start_date_obj, end_date_obj):
+        """Only reminders that can have an occurrence inside the window."""
+        return self._fetch_all(
+            "reminders",
+            "WHERE date <= ? AND (recurrence != 'None' OR date >= ?)",
+            (end_date_obj.strftime("%Y-%m-%d"), start_date_obj.strftime("%Y-%m-%d")),
+        )
+
+    def get_upcoming_reminders(self, weeks=1):
+        today = datetime.now().date()
+        end_date = today + timedelta(weeks=weeks)
+        candidates = self._reminders_overlapping(today, end_date)
+        upcoming = ReminderIndex(candidates).upcoming(today, end_date)
+        return [_with_display_date(reminder, day) for reminder, day in upcoming]
+
+    def get_reminder_occurrences(self, start_date_obj, end_date_obj):
+        candidates = self._reminders_overlapping(start_date_obj, end_date_obj)
+        return ReminderIndex(candidates).between(start_date_obj, end_date_obj)
+
+    def get_all_reminders(self):
+        return self._fetch_all("reminders")
+
+    def get_reminder_count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM reminders").fetchone()[0]
+
+    def delete_reminder(self, reminder_id):
+        self._delete("reminders", reminder_id)
+
+    def update_reminder(self, reminder_id, title, description, date_str, recurrence, start_time=None, end_time=None, exdates=None):
+        reminder = self._fetch_one("reminders", reminder_id)
+        if not reminder:
+            return None
+        self._apply_reminder_update(reminder, title, description, date_str, recurrence, start_time, end_time, exdates)
+        self._upsert("reminders", reminder)
+        return reminder
+
+    # --- Tasks ---
+    def add_task(self, title, description, status="Yet to Start"):
+        task = self._new_task(title, description, status)
+        self._upsert("tasks", task)
+        return task
+
+    def get_active_tasks(self):
+        return self._fetch_all("tasks", "WHERE status != 'Completed'")
+
+    def get_all_tasks(self):
+        return self._fetch_all("tasks")
+
+    def update_task_status(self, task_id, new_status):
+        task = self._fetch_one("tasks", task_id)
+        if not task:
+            return False
+        task["status"] = new_status
+        self._upsert("tasks", task)
+        return True
+
+    def update_task(self, task_id, title, description, status):
+        task = self._fetch_one("tasks", task_id)
+        if not task:
+            return None
+        task["title"] = title
+        task["description"] = description
+        task["status"] = status
+        self._upsert("tasks", task)
+        return task
+
+    def delete_task(self, task_id):
+        self._delete("tasks", task_id)
+
+    # --- Comments ---
+    def add_comment(self, item_type, item_id, text):
+        table = {"task": "tasks", "reminder": "reminders"}.get(item_type)
+        if not table:
+            return None
+        item = self._fetch_one(table, item_id)
+        if not item:
+            return None
+        comment = {
+            "text": text,
+            "timestamp": datetime.now().isoformat()
+        }
+        item.setdefault("comments", []).append(comment)
+        self._upsert(table, item)
+        return comment
+
+    def _apply_import(self, state):
+        with self.batch():
+            for table in ("reminders", "tasks", "projects"):
+                for item in state[table]:
+                    self._upsert(table, item)
+            for project_id, task in state["attach"]:
+                project = self.get_project(project_id)
+                if project:
+                    project["tasks"].append(task)
+                    self._upsert("projects", project)
+
+    def get_latest_comments(self, limit=5):
+        all_comments = []
+        for table, item_type in (("reminders", "Reminder"), ("tasks", "Task")):
+            for item in self._fetch_all(table, "WHERE json_array_length(doc, '$.comments') > 0"):
+                for c in item["comments"]:
+                    all_comments.append({
+                        "text": c["text"],
+                        "timestamp": c["timestamp"],
+                        "item_title": item["title"],
+                        "item_type": item_type
+                    })
+        all_comments.sort(key=lambda x: x["timestamp"], reverse=True)
+        return all_comments[:limit]
+
+    # --- Knowledge Base ---
+    def load_kb(self):
+        return self._fetch_all("kb")
+
+    def save_kb(self, kb_data):
+        with self._lock:
+            self.conn.execute("DELETE FROM kb")
+            for item in kb_data:
+                self._upsert("kb", item, commit=False)
+            self.conn.commit()
+            self._reset_changes()
+
+    def add_kb_item(self, title, data, url):
+        item = {
+            "id": str(uuid.uuid4()),
+            "title": title,
+            "data": data,
+            "url": url,
+            "created_at": datetime.now().isoformat()
+        }
+        self._upsert("kb", item)
+        return item
+
+    def update_kb_item(self, kb_id, title, data, url):
+        item = self._fetch_one("kb", kb_id)
+        if not item:
+            return None
+        item["title"] = title
+        item["data"] = data
+        item["url"] = url
+        self._upsert("kb", item)
+        return item
+
+    def delete_kb_item(self, kb_id):
+        self._delete("kb", kb_id)
+        return True
+
+    def search_kb_items(self, query):
+        if not query:
+            return self.load_kb()
+
+        query = query.lower()
+        # Let SQLite drop non-matching rows before any JSON is decoded
+        candidates = self._fetch_all(
+            "kb",
+            "WHERE instr(lower(title), ?) > 0 OR instr(lower(data), ?) > 0",
+            (query, query),
+        )
+        results = []
+        for item in candidates:
+            total_score = kb_search_score(item, query)
+            if total_score > 0:
+                results.append((item, total_score))
+        results.sort(key=lambda x: x[1], reverse=True)
+        return [r[0] for r in results]
+
+    # --- Projects ---
+    def load_projects(self):
+        return self._fetch_all("projects")
+
+    def get_project_summaries(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT json_remove(doc, '$.tasks') FROM projects ORDER BY seq").fetchall()
+        return [json_provider.loads(row[0]) for row in rows]
+
+    def get_active_projects(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT json_remove(doc, '$.tasks') FROM projects WHERE status != 'Completed' ORDER BY seq").fetchall()
+        return [json_provider.loads(row[0]) for row in rows]
+
+    def get_status_counts(self, collection):
+        # Served from the status indexes
+        table = "projects" if collection == "projects" else "tasks"
+        with self._lock:
+            rows = self.conn.execute(f"SELECT status, COUNT(*) FROM {table} GROUP BY status").fetchall()
+        return dict(rows)
+
+    def project_version(self, project_id):
+        return self.data_version("projects")
+
+    def get_project(self, project_id):
+        return self._fetch_one("projects", project_id)
+
+    def _save_project(self, project):
+        self._upsert("projects", project)
+
+    def delete_project(self, project_id):
+        self._delete("projects", project_id)
+        self._task_index.pop(project_id, None)
+        return True
+
+    # --- Migration ---
+    def import_json(self, data_file=DATA_FILE, kb_file=KB_FILE):
+        """Copy reminders, tasks, projects and KB items from the JSON files. Safe to re-run."""
+        # Reuse the JSON backend so a pending journal is replayed and
+        # project shards (or a legacy project.json) are read as well
+        json_manager = DataManager(data_file)
+        sources = {
+            "reminders": json_manager.data.get("reminders", []),
+            "tasks": json_manager.data.get("tasks", []),
+            "kb": _read_json_list(kb_file),
+            "projects": json_manager.load_projects(),
+        }
+        counts = {}
+        with self._lock:
+            for table, items in sources.items():
+                for item in items:
+                    self._upsert(table, item, commit=False)
+                counts[table] = len(items)
+            self.conn.commit()
+        return counts
+
+
+def _read_json_list(path):
+    if not os.path.exists(path):
+        return []
+    try:
+        return json_provider.load_file(path)
+    except (json.JSONDecodeError, IOError):
+        return []
+
+
+if __name__ == '__main__':
+    # Usage: python sqlite_store.py migrate [database path]
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        print("Usage: python sqlite_store.py migrate [database path]")
+        sys.exit(1)
+    db_file = sys.argv[2] if len(sys.argv) > 2 else SQLITE_FILE
+    counts = SQLiteDataManager(db_file).import_json()
+    print(f"Imported into {db_file}: " + ", ".join(f"{n} {table}" for table, n in counts.items()))
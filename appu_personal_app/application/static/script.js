@@ -70,6 +70,61 @@ document.addEventListener('DOMContentLoaded', () => {
         window.setTimeout(focusReminderFindings, 150);
     }
 
+    // Due reminders are pushed by the server the moment they fire
+    function showReminderAlert(alert) {
+        const when = alert.start_time ? `${alert.date} ${alert.start_time}` : alert.date;
+        if (window.Notification && Notification.permission === 'granted') {
+            new Notification(`⏰ ${alert.title}`, { body: alert.description || when, tag: `${alert.id}-${alert.date}` });
+        }
+        const el = document.createElement('div');
+        el.className = 'reminder-alert';
+        el.innerText = `⏰ ${alert.title} · ${when}`;
+        el.style.position = 'fixed';
+        el.style.top = '20px';
+        el.style.right = '20px';
+        el.style.background = 'rgba(0,0,0,0.85)';
+        el.style.color = 'white';
+        el.style.padding = '12px 20px';
+        el.style.borderRadius = '10px';
+        el.style.zIndex = '9999';
+        el.style.cursor = 'pointer';
+        el.style.boxShadow = '0 4px 12px rgba(0,0,0,0.3)';
+        el.addEventListener('click', () => el.remove());
+        document.body.appendChild(el);
+        setTimeout(() => el.remove(), 15000);
+    }
+
+    // Each stream holds a server thread, so one tab per browser listens and
+    // passes alerts on to the others; when it closes, another tab takes over
+    function openReminderStream(relay) {
+        const reminderStream = new EventSource('/api/reminders/stream');
+        reminderStream.addEventListener('reminder', (event) => {
+            const alert = JSON.parse(event.data);
+            showReminderAlert(alert);
+            if (relay) relay.postMessage(alert);
+        });
+        window.addEventListener('beforeunload', () => reminderStream.close());
+    }
+
+    if (window.EventSource) {
+        if (navigator.locks && window.BroadcastChannel) {
+            const reminderChannel = new BroadcastChannel('reminder-alerts');
+            reminderChannel.addEventListener('message', (event) => showReminderAlert(event.data));
+            navigator.locks.request('reminder-stream', () => {
+                openReminderStream(reminderChannel);
+                return new Promise(() => {}); // Held until this tab closes
+            });
+        } else {
+            openReminderStream(null);
+        }
+    }
+
+    if (window.Notification && Notification.permission === 'default') {
+        reminderFlashLinks.forEach(link => {
+            link.addEventListener('click', () => Notification.requestPermission(), { once: true });
+        });
+    }
+
     // Theme Logic
     const colorSchemeThemes = [
         'dragon',
@@ -174,13 +229,14 @@ document.addEventListener('DOMContentLoaded', () => {
         timeframeSlider.addEventListener('input', async (e) => {
             const weeks = e.target.value;
             timeframeValue.innerText = weeks;
-            const res = await fetch(`/api/all_data?weeks=${weeks}`);
-            const data = await res.json();
-            updateReminderList(data.reminders, weeks);
+            // Occurrences are projected on the server, which knows every recurrence rule
+            const res = await fetch(`/api/reminders/upcoming?weeks=${weeks}`);
+            const upcoming = await res.json();
+            updateReminderList(upcoming);
         });
     }
 
-    async function updateReminderList(allReminders, weeks) {
+    async function updateReminderList(upcoming) {
         const reminderList = document.querySelector('.reminder-list');
         if (!reminderList) return;
 
@@ -196,25 +252,6 @@ document.addEventListener('DOMContentLoaded', () => {
         const today = new Date();
         today.setHours(0, 0, 0, 0);
 
-        const endDate = new Date(today);
-        endDate.setDate(today.getDate() + (weeks * 7));
-        endDate.setHours(23, 59, 59, 999);
-
-        const upcoming = [];
-        allReminders.forEach(rem => {
-            const remDate = new Date(rem.date + 'T00:00:00');
-            let nextOccur = getNextOccurrence(remDate, rem.recurrence, today);
-
-            if (nextOccur && nextOccur >= today && nextOccur <= endDate) {
-                upcoming.push({
-                    ...rem,
-                    display_date: nextOccur.toISOString().split('T')[0]
-                });
-            }
-        });
-
-        upcoming.sort((a, b) => new Date(a.display_date) - new Date(b.display_date));
-
         if (upcoming.length > 0) {
             reminderList.innerHTML = upcoming.map(rem => {
                 const remDate = new Date(rem.display_date + 'T00:00:00');
@@ -238,13 +275,13 @@ document.addEventListener('DOMContentLoaded', () => {
                     ` • ${rem.start_time || ''}${rem.end_time ? ' - ' + rem.end_time : ''}` : '';
 
                 return `
-                <div class="item-card recur-${rem.recurrence.toLowerCase()}" 
+                <div class="item-card recur-${rem.recurrence_kind}" 
                     onclick="viewComments('reminder', '${rem.id}', '${rem.title.replace(/'/g, "\\'")}')"
                     style="${bgColor ? `background-color: ${bgColor};` : ''} ${textColorStyle} position: relative;">
                     <div class="item-card-header">
                         <div>
                             <h4 class="item-card-title" style="${textColorStyle}">${rem.title}</h4>
-                            <div class="item-card-meta" style="${bgColor ? 'color: rgba(255,255,255,0.8);' : ''}">${rem.display_date}${timeStr} • ${rem.recurrence}</div>
+                            <div class="item-card-meta" style="${bgColor ? 'color: rgba(255,255,255,0.8);' : ''}">${rem.display_date}${timeStr} • ${rem.recurrence_label}</div>
                         </div>
                         <span class="delete-icon delete-btn" data-type="reminders" data-id="${rem.id}"
                             onclick="event.stopPropagation()" style="${iconStyle}">🗑️</span>
@@ -256,25 +293,41 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
-    function getNextOccurrence(startDate, recurrence, relativeTo) {
-        let current = new Date(startDate);
-        current.setHours(0, 0, 0, 0);
-        let rel = new Date(relativeTo);
-        rel.setHours(0, 0, 0, 0);
-        if (recurrence === 'None') return current >= rel ? current : null;
-        while (current < rel) {
-            if (recurrence === 'Daily') current.setDate(current.getDate() + 1);
-            else if (recurrence === 'Weekly') current.setDate(current.getDate() + 7);
-            else if (recurrence === 'Monthly') {
-                let d = current.getDate();
-                current.setMonth(current.getMonth() + 1);
-                if (current.getDate() != d) current.setDate(0);
-            }
-            else if (recurrence === 'Yearly') current.setFullYear(current.getFullYear() + 1);
-        }
-        return current;
+    // Recurrence picker: the simple options, or "Custom" with an RRULE typed in
+    const SIMPLE_RECURRENCES = ['None', 'Daily', 'Weekly', 'Monthly', 'Yearly'];
+
+    function readRecurrence(prefix) {
+        const choice = document.getElementById(prefix + 'Recur').value;
+        return choice === 'Custom' ? document.getElementById(prefix + 'Rule').value.trim() : choice;
     }
 
+    function readExdates(prefix) {
+        return document.getElementById(prefix + 'Exdates').value
+            .split(',')
+            .map(d => d.trim())
+            .filter(Boolean);
+    }
+
+    function setRecurrence(prefix, recurrence) {
+        const select = document.getElementById(prefix + 'Recur');
+        const rule = document.getElementById(prefix + 'Rule');
+        if (!select) return;
+        const isSimple = SIMPLE_RECURRENCES.includes(recurrence);
+        select.value = isSimple ? recurrence : 'Custom';
+        if (rule) rule.value = isSimple ? '' : recurrence;
+        toggleRuleInput(prefix);
+    }
+
+    function toggleRuleInput(prefix) {
+        const group = document.getElementById(prefix + 'RuleGroup');
+        const select = document.getElementById(prefix + 'Recur');
+        if (group && select) group.style.display = select.value === 'Custom' ? 'block' : 'none';
+    }
+
+    ['rem', 'editRem'].forEach(prefix => {
+        document.getElementById(prefix + 'Recur')?.addEventListener('change', () => toggleRuleInput(prefix));
+    });
+
     window.openCreateModal = function (type) {
         modal.style.display = "block";
         const title = document.getElementById('modalTitle');
@@ -416,7 +469,7 @@ document.addEventListener('DOMContentLoaded', () => {
         if (id) {
             titleEm.innerText = "Edit Knowledge Base";
             // Fetch the item to populate the form
-            const res = await fetch('/api/kb');
+            const res = await fetch(`/api/kb?id=${encodeURIComponent(id)}`);
             const items = await res.json();
             const item = items.find(i => i.id === id);
             if (item) {
@@ -478,6 +531,28 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Reminders and tasks mirrored in sessionStorage and brought up to date
+    // through /api/changes, so only what changed since the last look is fetched
+    async function loadSyncedData() {
+        let store = null;
+        try {
+            store = JSON.parse(sessionStorage.getItem('syncedData'));
+        } catch (e) { }
+        const since = store ? `&since=${encodeURIComponent(store.version)}` : '';
+        const res = await fetch(`/api/changes?collections=reminders,tasks${since}`);
+        const changes = await res.json();
+        if (!store || changes.full) store = { reminders: {}, tasks: {} };
+        ['reminders', 'tasks'].forEach(name => {
+            changes[name].upserted.forEach(item => { store[name][item.id] = item; });
+            changes[name].deleted.forEach(id => { delete store[name][id]; });
+        });
+        store.version = changes.version;
+        try {
+            sessionStorage.setItem('syncedData', JSON.stringify(store));
+        } catch (e) { } // Over quota: next time starts from a full snapshot
+        return { reminders: Object.values(store.reminders), tasks: Object.values(store.tasks) };
+    }
+
     // View Comments Logic
     window.viewComments = async function (itemType, itemId, itemTitle) {
         const commentsList = document.getElementById('commentsList');
@@ -490,8 +565,7 @@ document.addEventListener('DOMContentLoaded', () => {
         modalTitle.innerText = `Comments: ${itemTitle}`;
         commentsList.innerHTML = '<p style="text-align:center;">Loading...</p>';
         commentsModal.style.display = "block";
-        const res = await fetch('/api/all_data');
-        const data = await res.json();
+        const data = await loadSyncedData();
         const items = itemType === 'task' ? data.tasks : data.reminders;
         const item = items.find(i => i.id === itemId);
         if (item) {
@@ -581,7 +655,7 @@ document.addEventListener('DOMContentLoaded', () => {
         window.openEditModal = function () { };
     }
 
-    window.openEditModal = function (type, id, title, description, dateOrStatus, recurrence = null, startTime = null, endTime = null) {
+    window.openEditModal = function (type, id, title, description, dateOrStatus, recurrence = null, startTime = null, endTime = null, exdates = '') {
         // Ensure function is called
         if (!type || !id) {
             console.error('openEditModal called with invalid parameters:', { type, id });
@@ -646,7 +720,9 @@ document.addEventListener('DOMContentLoaded', () => {
             if (titleField) titleField.value = String(title || '').replace(/\\'/g, "'");
             if (descField) descField.value = String(description || '').replace(/\\'/g, "'");
             if (dateField) dateField.value = String(dateOrStatus || '');
-            if (recurField) recurField.value = String(recurrence || 'None');
+            if (recurField) setRecurrence('editRem', String(recurrence || 'None'));
+            const exdatesField = document.getElementById('editRemExdates');
+            if (exdatesField) exdatesField.value = exdates || '';
 
             const startField = document.getElementById('editRemStartTime');
             const endField = document.getElementById('editRemEndTime');
@@ -691,6 +767,13 @@ document.addEventListener('DOMContentLoaded', () => {
         return true;
     }
 
+    // Saved reminders come back with the timed reminders they overlap, if any
+    function warnReminderConflicts(reminder) {
+        if (!reminder || !reminder.conflicts || !reminder.conflicts.length) return;
+        const lines = reminder.conflicts.map(c => `• ${c.title} (${c.start.replace('T', ' ')} - ${c.end.slice(11)})`);
+        alert('Saved, but this reminder overlaps:\n' + lines.join('\n'));
+    }
+
     // Form Submission Handlers
     document.getElementById('reminderForm')?.addEventListener('submit', async (e) => {
         e.preventDefault();
@@ -698,7 +781,8 @@ document.addEventListener('DOMContentLoaded', () => {
             title: document.getElementById('remTitle').value,
             description: document.getElementById('remDesc').value,
             date: document.getElementById('remDate').value,
-            recurrence: document.getElementById('remRecur').value,
+            recurrence: readRecurrence('rem'),
+            exdates: readExdates('rem'),
             start_time: document.getElementById('remStartTime').value,
             end_time: document.getElementById('remEndTime').value
         };
@@ -708,6 +792,7 @@ document.addEventListener('DOMContentLoaded', () => {
             body: JSON.stringify(data)
         });
         if (res.ok) {
+            warnReminderConflicts(await res.json());
             closeModal();
             // Save current tab before reload
             if (window.location.pathname === '/all') {
@@ -718,7 +803,8 @@ document.addEventListener('DOMContentLoaded', () => {
             }
             window.location.reload();
         } else {
-            alert('Failed to create reminder');
+            const errorData = await res.json().catch(() => ({}));
+            alert('Failed to create reminder' + (errorData.error ? ': ' + errorData.error : ''));
         }
     });
 
@@ -763,7 +849,8 @@ document.addEventListener('DOMContentLoaded', () => {
             title: document.getElementById('editRemTitle').value,
             description: document.getElementById('editRemDesc').value,
             date: document.getElementById('editRemDate').value,
-            recurrence: document.getElementById('editRemRecur').value,
+            recurrence: readRecurrence('editRem'),
+            exdates: readExdates('editRem'),
             start_time: document.getElementById('editRemStartTime').value,
             end_time: document.getElementById('editRemEndTime').value
         };
@@ -775,6 +862,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 body: JSON.stringify(data)
             });
             if (res.ok) {
+                warnReminderConflicts(await res.json());
                 closeEditModal();
                 // Save current tab before reload
                 if (window.location.pathname === '/all') {
@@ -786,7 +874,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 window.location.reload();
             } else {
                 const errorData = await res.json().catch(() => ({}));
-                alert('Failed to update reminder: ' + (errorData.message || 'Unknown error'));
+                alert('Failed to update reminder: ' + (errorData.error || errorData.message || 'Unknown error'));
             }
         } catch (error) {
             console.error('Error updating reminder:', error);
@@ -860,7 +948,8 @@ document.addEventListener('DOMContentLoaded', () => {
                     const recurrence = btn.getAttribute('data-edit-recurrence') || 'None';
                     const startTime = btn.getAttribute('data-edit-start-time') || null;
                     const endTime = btn.getAttribute('data-edit-end-time') || null;
-                    openEditModal('reminder', editId, title, description, date, recurrence, startTime, endTime);
+                    const exdates = btn.getAttribute('data-edit-exdates') || '';
+                    openEditModal('reminder', editId, title, description, date, recurrence, startTime, endTime, exdates);
                 }
                 return;
             }
@@ -936,7 +1025,11 @@ document.addEventListener('DOMContentLoaded', () => {
                 alert(msg);
                 window.location.reload();
             } else {
-                alert('Upload failed: ' + (result.error || 'Unknown error'));
+                let msg = 'Upload failed: ' + (result.error || 'Unknown error');
+                if (result.errors && result.errors.length > 0) {
+                    msg += `\n\n- ` + result.errors.join('\n- ');
+                }
+                alert(msg);
             }
         } catch (e) {
             console.error('Error during bulk upload:', e);
@@ -0,0 +1,75 @@
+import os
+import tempfile
+
+import data_manager
+from data_manager import DataManager
+
+
+def use_data_dir(path):
+    """Point the data manager's files at a scratch directory."""
+    data_manager.KB_FILE = data_manager.COLLECTION_FILES["kb"] = os.path.join(path, "knowledgebase.json")
+    data_manager.SETTINGS_FILE = data_manager.COLLECTION_FILES["settings"] = os.path.join(path, "settings.json")
+    data_manager.PROJECTS_DIR = os.path.join(path, "projects")
+    data_manager.PROJECT_MANIFEST = os.path.join(path, "project_manifest.json")
+    data_manager.PROJECT_FILE = os.path.join(path, "project.json")
+    return os.path.join(path, "data.json")
+
+
+def changed_ids(changes, collection):
+    return ({item["id"] for item in changes[collection]["upserted"]}, set(changes[collection]["deleted"]))
+
+
+def main():
+    dm = DataManager(use_data_dir(tempfile.mkdtemp()))
+    failures = []
+
+    def check(name, changes, collection, upserted=(), deleted=()):
+        if changes["full"]:
+            failures.append(f"{name}: got a full snapshot instead of a delta")
+        elif changed_ids(changes, collection) != (set(upserted), set(deleted)):
+            failures.append(f"{name}: expected {set(upserted)} / {set(deleted)}, got {changed_ids(changes, collection)}")
+
+    version = dm.changes_since(None)["version"]
+    reminder = dm.add_reminder("Dentist", "", "2026-03-01", "None")
+    task = dm.add_task("Taxes", "")
+    changes = dm.changes_since(version)
+    check("add reminder", changes, "reminders", [reminder["id"]])
+    check("add task", changes, "tasks", [task["id"]])
+
+    version = changes["version"]
+    project = dm.add_project("Kitchen", "", "2026-01-01", "2026-02-01", "Yet to Start")
+    check("add project", dm.changes_since(version, ("projects",)), "projects", [project["id"]])
+
+    other = dm.add_project("Garden", "", "2026-04-01", "2026-05-01", "Yet to Start")
+    version = dm.changes_since(None)["version"]
+    dm.update_project(project["id"], "Kitchen", "Tiles", "2026-01-01", "2026-03-01", "In Progress")
+    check("update project", dm.changes_since(version, ("projects",)), "projects", [project["id"]])
+
+    version = dm.changes_since(None)["version"]
+    dm.add_project_task(project["id"], "Order tiles", "", "2026-01-02", "2026-01-09")
+    check("add project task", dm.changes_since(version, ("projects",)), "projects", [project["id"]])
+
+    version = dm.changes_since(None)["version"]
+    dm.delete_project(other["id"])
+    dm.delete_reminder(reminder["id"])
+    changes = dm.changes_since(version)
+    check("delete project", changes, "projects", deleted=[other["id"]])
+    check("delete reminder", changes, "reminders", deleted=[reminder["id"]])
+
+    # A write by another process cannot be itemised, so it forces a full resync
+    version = dm.changes_since(None)["version"]
+    DataManager(dm.data_file).add_project("Elsewhere", "", "2026-06-01", "2026-06-02", "Yet to Start")
+    if not dm.changes_since(version)["full"]:
+        failures.append("external project write: expected a full snapshot")
+
+    for failure in failures:
+        print(f"MISMATCH {failure}")
+    if failures:
+        print(f"FAILED: {len(failures)} checks")
+        return False
+    print("SUCCESS: changes_since returns only the changed items")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import json
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import json_provider
+from data_manager import DataManager
+from json_provider import FastJSONProvider
+
+
+# Status values the app's forms offer
+TASK_STATUSES = ["Yet to Start", "Pending", "wip", "Onhold", "Completed"]
+PROJECT_STATUSES = ["Yet to Start", "Work In progress", "On-Hold", "Completed", "Delayed"]
+
+
+def generate_data(rng, reminders=20000, tasks=20000, projects=200, project_tasks=50, kb_items=2000):
+    """
+    A data.json, project shards and KB far larger than any real install, built
+    with the data manager's own item constructors so the shape is the real one.
+    """
+    dm = DataManager.__new__(DataManager) # Only the item constructors are used
+    start = date(2024, 1, 1)
+
+    def day(spread=720):
+        return (start + timedelta(days=rng.randint(0, spread))).isoformat()
+
+    def add_comments(comments, count):
+        for i in range(count):
+            comments.append({"text": f"Comment {i} — naïve café ✓", "timestamp": f"{day()}T10:{i % 60:02d}:00"})
+
+    data = {"reminders": [], "tasks": []}
+    for i in range(reminders):
+        recurrence = rng.choice(["None", "Daily", "Weekly", "Monthly", "Yearly", "FREQ=WEEKLY;BYDAY=MO,WE"])
+        start_time = f"{rng.randint(0, 22):02d}:00" if rng.random() < 0.7 else None
+        end_time = f"{int(start_time[:2]) + 1:02d}:00" if start_time and rng.random() < 0.5 else None
+        exdates = [day() for _ in range(rng.randint(0, 2))] if recurrence != "None" else None
+        reminder = dm._new_reminder(f"Reminder {i}", "Call the supplier about the quarterly order " * rng.randint(0, 3),
+                                    day(), recurrence, start_time, end_time, exdates)
+        add_comments(reminder["comments"], rng.randint(0, 2))
+        data["reminders"].append(reminder)
+    for i in range(tasks):
+        task = dm._new_task(f"Task {i}", "Follow up with the team", rng.choice(TASK_STATUSES))
+        add_comments(task["comments"], rng.randint(0, 3))
+        data["tasks"].append(task)
+
+    shards = []
+    for p in range(projects):
+        project = dm._new_project(f"Project {p}", "Office move", day(), day(), rng.choice(PROJECT_STATUSES))
+        for t in range(project_tasks):
+            task = dm._new_project_task(f"Work item {t}", "Notes", day(), day(), status=rng.choice(PROJECT_STATUSES))
+            add_comments(task["task_comments"], rng.randint(0, 2))
+            for s in range(rng.randint(0, 3)):
+                task["subtasks"].append(dm._new_project_task(f"Step {s}", "", task["start_date"], task["end_date"], task["id"]))
+            project["tasks"].append(task)
+        shards.append(project)
+
+    # KB items are built inline by add_kb_item; same fields here
+    kb = [{"id": str(uuid.UUID(int=rng.getrandbits(128))), "title": f"How to {i}", "data": "Step one, step two. " * 20,
+           "url": f"https://example.com/{i}", "created_at": f"{day()}T09:00:00"} for i in range(kb_items)]
+    return data, shards, kb
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main(repeat=5, seed=0):
+    data, shards, kb = generate_data(random.Random(seed))
+    failures = 0
+
+    # Both backends must read back exactly what they were given, pretty or not
+    for name, document in (("data.json", data), ("project shards", shards), ("knowledgebase.json", kb)):
+        for pretty in (False, True):
+            encoded = json_provider.dumpb(document, pretty=pretty)
+            if json_provider.loads(encoded) != document or json.loads(encoded) != document:
+                failures += 1
+                print(f"MISMATCH: {name} round trip differs (pretty={pretty})")
+
+    print(f"JSON backend: {json_provider.BACKEND}")
+    print(f"{'storage (data.json)':<34}{'write':>10}{'read':>10}{'size':>12}")
+    old_write, old_text = best_of(repeat, lambda: json.dumps(data, indent=4))
+    old_read, _ = best_of(repeat, lambda: json.loads(old_text))
+    print(f"{'stdlib, indent=4 (before)':<34}{old_write * 1000:>8.1f}ms{old_read * 1000:>8.1f}ms{len(old_text) / 1e6:>10.2f}MB")
+    cases = [("stdlib, compact", lambda: json.dumps(data, separators=(",", ":")).encode("utf-8"), json.loads)]
+    if json_provider.orjson:
+        cases.append(("orjson, compact", lambda: json_provider.dumpb(data), json_provider.loads))
+        cases.append(("orjson, pretty_json=True", lambda: json_provider.dumpb(data, pretty=True), json_provider.loads))
+    for name, write, read in cases:
+        write_time, encoded = best_of(repeat, write)
+        read_time, _ = best_of(repeat, lambda: read(encoded))
+        print(f"{name:<34}{write_time * 1000:>8.1f}ms{read_time * 1000:>8.1f}ms{len(encoded) / 1e6:>10.2f}MB"
+              f"   ({old_write / write_time:.1f}x write, {old_read / read_time:.1f}x read)")
+
+    # jsonify the payloads /api/all_data (reminders and tasks) and /api/projects return
+    payloads = [("/api/all_data", {"reminders": data["reminders"], "tasks": data["tasks"]}), ("/api/projects", shards)]
+    print(f"\n{'jsonify':<34}{'default':>10}{'fast':>10}")
+    for path, payload in payloads:
+        timings = []
+        bodies = []
+        for provider in (DefaultJSONProvider, FastJSONProvider):
+            app = Flask(__name__)
+            app.json = provider(app)
+            with app.app_context():
+                elapsed, response = best_of(repeat, lambda: app.json.response(payload))
+            timings.append(elapsed)
+            bodies.append(response.get_data())
+        if json.loads(bodies[0]) != json.loads(bodies[1]):
+            failures += 1
+            print(f"MISMATCH: {path} responses differ")
+        print(f"{path:<34}{timings[0] * 1000:>8.1f}ms{timings[1] * 1000:>8.1f}ms   ({timings[0] / timings[1]:.1f}x)")
+
+    if failures:
+        print(f"FAILED: {failures} mismatches")
+        return False
+    print("SUCCESS: both backends round-trip the generated data")
+    return True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import calendar
+import random
+from datetime import date, timedelta
+
+from data_manager import DataManager
+from ical_export import _rrule
+from reminder_index import RuleRecurrence, occurrences_between, parse_rule
+
+
+def reference_next_occurrence(start_date, recurrence, relative_to):
+    """The original step-by-step loop, kept here as the reference behaviour."""
+    if recurrence == "None":
+        return start_date if start_date >= relative_to else None
+
+    current_occurrence = start_date
+
+    while current_occurrence < relative_to:
+        if recurrence == "Daily":
+            current_occurrence += timedelta(days=1)
+        elif recurrence == "Weekly":
+            current_occurrence += timedelta(weeks=1)
+        elif recurrence == "Monthly":
+            year = current_occurrence.year
+            month = current_occurrence.month
+            day = current_occurrence.day
+            month += 1
+            if month > 12:
+                month = 1
+                year += 1
+            _, last_day = calendar.monthrange(year, month)
+            new_day = min(day, last_day)
+            current_occurrence = current_occurrence.replace(year=year, month=month, day=new_day)
+        elif recurrence == "Yearly":
+            try:
+                current_occurrence = current_occurrence.replace(year=current_occurrence.year + 1)
+            except ValueError:
+                current_occurrence = current_occurrence.replace(year=current_occurrence.year + 1, day=28)
+
+    return current_occurrence
+
+
+def random_date(rng):
+    # Bias towards month ends and leap days, where the clamping rules matter
+    year = rng.randint(1896, 2104)
+    month = rng.randint(1, 12)
+    last_day = calendar.monthrange(year, month)[1]
+    day = rng.choice([rng.randint(1, last_day), last_day, min(29, last_day)])
+    if rng.random() < 0.1 and calendar.isleap(year):
+        month, day = 2, 29
+    return date(year, month, day)
+
+
+def check_ical_rules(rng, iterations=500, years=12):
+    """
+    The RRULE written by the calendar export, expanded by the app's own rule
+    engine (which, like RFC 5545, always counts DTSTART as the first occurrence),
+    must give the same dates as the simple recurrence it was exported from.
+    """
+    failures = 0
+    starts = [date(year, 2, 29) for year in range(1896, 2105, 4) if calendar.isleap(year)]
+    starts += [random_date(rng) for _ in range(iterations)]
+    for start in starts:
+        end = start + timedelta(days=365 * years)
+        for recurrence in ("Daily", "Weekly", "Monthly", "Yearly"):
+            try:
+                rule = parse_rule(_rrule(recurrence, start, None))
+            except ValueError:
+                continue # BYSETPOS (Monthly from the 29th-31st) is beyond the app's rule subset
+            expected = list(occurrences_between(start, recurrence, start, end))
+            actual = list(RuleRecurrence(start, rule).between(start, end))
+            if actual != expected:
+                failures += 1
+                if failures <= 10:
+                    diff = next(i for i, pair in enumerate(zip(expected + [None], actual + [None])) if pair[0] != pair[1])
+                    print(f"MISMATCH iCalendar {recurrence} start={start}: occurrence {diff} expected "
+                          f"{(expected + [None])[diff]}, got {(actual + [None])[diff]}")
+    return failures
+
+
+def main(iterations=3000, seed=0):
+    rng = random.Random(seed)
+    dm = DataManager.__new__(DataManager) # Only the date arithmetic is exercised
+    failures = 0
+    for _ in range(iterations):
+        start = random_date(rng)
+        relative_to = start + timedelta(days=rng.randint(-400, 30 * 365))
+        for recurrence in ("None", "Daily", "Weekly", "Monthly", "Yearly"):
+            expected = reference_next_occurrence(start, recurrence, relative_to)
+            actual = dm._get_next_occurrence(start, recurrence, relative_to)
+            if actual != expected:
+                failures += 1
+                if failures <= 10:
+                    print(f"MISMATCH {recurrence} start={start} relative_to={relative_to}: expected {expected}, got {actual}")
+    failures += check_ical_rules(rng)
+    if failures:
+        print(f"FAILED: {failures} mismatches")
+        return False
+    print(f"SUCCESS: {iterations} random dates agree for every recurrence, and with the exported RRULEs")
+    return True
+
+
+if __name__ == "__main__":
+    main()